@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Kiosk load-test harness for IronLifter.
+
+Replays bursts of /api/checkin traffic (valid, grace, expired and double-tap
+identifiers) against the real WSGI app, either in-process through Flask's
+test client or over HTTP against a running server, and reports throughput
+and p50/p95/p99 latency.
+
+Examples:
+    # In-process against a throwaway SQLite file (default)
+    python kiosk_load_test.py --requests 2000 --threads 8
+
+    # Compare SQLite and PostgreSQL (each DB runs in its own process)
+    python kiosk_load_test.py --db sqlite:////tmp/load.db --db postgresql://user:pw@localhost/gym_load
+
+    # Against a running server (main.py); seeds into the same DATABASE_URL
+    DATABASE_URL=postgresql://... python kiosk_load_test.py --url http://127.0.0.1:5000
+
+Seeded members are tagged with the LOADTEST_ prefix and removed afterwards
+(use --keep to leave them).
+
+WARNING: never point this at a production database. The run writes real
+check-ins into attendance, daily_stats and the in-memory report caches, and
+cleanup bulk-deletes them again and rebuilds daily_stats for the affected
+days. Use a dedicated or throwaway database; the script refuses to run
+against one that already holds other members unless --force is given. With
+--url, restart the target server afterwards so its in-memory caches
+(peak hours, attendance columns) drop the deleted check-ins.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+NAME_PREFIX = "LOADTEST_"
+
+# Share of traffic per scenario; double-taps re-use already admitted members
+DEFAULT_MIX = {"valid": 0.70, "grace": 0.10, "expired": 0.10, "double_tap": 0.10}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# ==========================================
+# DATA SET
+# ==========================================
+def seed_members(app, counts):
+    """Create LOADTEST_ members for each scenario; returns {scenario: [member_code, ...]}."""
+    from src.models import db, Member, Plan
+
+    grace_days = app.config.get("GRACE_PERIOD_DAYS", 3)
+    today = date.today()
+    expiry_for = {
+        "valid": today + timedelta(days=30),
+        "grace": today - timedelta(days=max(1, grace_days - 1)),
+        "expired": today - timedelta(days=grace_days + 10),
+    }
+
+    with app.app_context():
+        plan = Plan.query.filter_by(name=f"{NAME_PREFIX}Plan").first()
+        if not plan:
+            plan = Plan(name=f"{NAME_PREFIX}Plan", price=1000, duration_days=30)
+            db.session.add(plan)
+            db.session.commit()
+
+        codes = {}
+        for scenario, count in counts.items():
+            codes[scenario] = []
+            for i in range(count):
+                code = Member.generate_unique_code()
+                db.session.add(Member(
+                    member_code=code,
+                    name=f"{NAME_PREFIX}{scenario} {i}",
+                    phone=f"7{random.randint(100000000, 999999999)}",
+                    plan_id=plan.id,
+                    join_date=expiry_for[scenario] - timedelta(days=30),
+                    expiry_date=expiry_for[scenario],
+                    status="Active",
+                ))
+                codes[scenario].append(code)
+                if i % 200 == 199:
+                    db.session.flush()
+            db.session.commit()
+    return codes
+
+
+def other_members(app):
+    """Members not created by this script (a non-empty database is probably a real one)."""
+    from src.models import Member
+
+    with app.app_context():
+        return Member.query.filter(~Member.name.like(f"{NAME_PREFIX}%")).count()
+
+
+def cleanup_members(app):
+    """
+    Remove LOADTEST_ members and their check-ins. The check-ins go in one bulk
+    DELETE, which skips the model events that maintain daily_stats, so the
+    affected days are rebuilt and the in-process caches reset afterwards.
+    """
+    from sqlalchemy import func
+    from src.models import db, Member, Plan, Attendance
+    from src.utils import daily_stats
+    from src.utils.member_bulk import resync_member_caches
+    from src.utils.peak_hours import peak_hours
+    from src.utils.attendance_columns import attendance_columns
+
+    with app.app_context():
+        ids = [m.id for m in Member.query.filter(Member.name.like(f"{NAME_PREFIX}%")).all()]
+        first_day = None
+        if ids:
+            first_day = db.session.query(func.min(Attendance.date)).filter(Attendance.member_id.in_(ids)).scalar()
+            db.session.query(Attendance).filter(Attendance.member_id.in_(ids)).delete(synchronize_session=False)
+            for member in Member.query.filter(Member.id.in_(ids)).all():
+                db.session.delete(member)
+        Plan.query.filter_by(name=f"{NAME_PREFIX}Plan").delete()
+        db.session.commit()
+        if first_day:
+            daily_stats.rebuild(since=first_day)
+        resync_member_caches()
+        peak_hours.clear()
+        attendance_columns.clear()
+
+
+def build_schedule(total, mix, codes):
+    """Returns a shuffled list of (scenario, identifier) to replay."""
+    plan = []
+    for scenario, share in mix.items():
+        n = int(round(total * share))
+        if scenario == "double_tap":
+            plan += [(scenario, None)] * n
+        else:
+            pool = codes[scenario]
+            plan += [(scenario, pool[i % len(pool)]) for i in range(n)]
+    random.shuffle(plan)
+    return plan
+
+
+# ==========================================
+# CLIENTS
+# ==========================================
+CSRF_RE = re.compile(r'name="csrf-token" content="([^"]+)"')
+
+
+class InProcessClient:
+    """One Flask test client per worker thread, primed like a real kiosk page."""
+
+    def __init__(self, app):
+        self.app = app
+        self.secret = app.config.get("KIOSK_SECRET_TOKEN")
+        self._local = threading.local()
+
+    def prime(self):
+        self._client()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            client = self.app.test_client()
+            page = client.get("/kiosk").get_data(as_text=True)
+            match = CSRF_RE.search(page)
+            self._local.client = client
+            self._local.csrf = match.group(1) if match else ""
+        return self._local.client
+
+    def checkin(self, identifier):
+        client = self._client()
+        resp = client.post("/api/checkin", json={"member_id": identifier}, headers={
+            "X-Kiosk-Secret": self.secret,
+            "X-CSRFToken": self._local.csrf,
+        })
+        return resp.status_code, resp.get_json(silent=True) or {}
+
+
+class HttpClient:
+    """One requests.Session per worker thread against a running server."""
+
+    def __init__(self, base_url, secret):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip("/")
+        self.secret = secret
+        self._local = threading.local()
+
+    def prime(self):
+        self._session()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            session = self.requests.Session()
+            page = session.get(f"{self.base_url}/kiosk", timeout=10).text
+            match = CSRF_RE.search(page)
+            self._local.session = session
+            self._local.csrf = match.group(1) if match else ""
+        return self._local.session
+
+    def checkin(self, identifier):
+        session = self._session()
+        resp = session.post(f"{self.base_url}/api/checkin", json={"member_id": identifier}, headers={
+            "X-Kiosk-Secret": self.secret,
+            "X-CSRFToken": self._local.csrf,
+        }, timeout=30)
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, {}
+
+
+# ==========================================
+# RUNNER
+# ==========================================
+def run_load(client, schedule, threads, burst, pause):
+    admitted = []
+    admitted_lock = threading.Lock()
+    samples = []  # (scenario, latency_ms, http_status, api_status, success)
+    samples_lock = threading.Lock()
+
+    def fire(item):
+        scenario, identifier = item
+        if scenario == "double_tap":
+            with admitted_lock:
+                identifier = random.choice(admitted) if admitted else None
+            if identifier is None:
+                return  # nobody admitted yet; nothing to double-tap
+        started = time.perf_counter()
+        try:
+            http_status, body = client.checkin(identifier)
+        except Exception as e:
+            http_status, body = 0, {"status": f"error: {type(e).__name__}"}
+        latency = (time.perf_counter() - started) * 1000
+        if body.get("success"):
+            with admitted_lock:
+                admitted.append(identifier)
+        api_status = body.get("status") or ("duplicate" if "Already checked in" in str(body.get("message")) else "rejected")
+        with samples_lock:
+            samples.append((scenario, latency, http_status, api_status, bool(body.get("success"))))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        # Open one kiosk session per worker first so CSRF priming stays out of the numbers
+        barrier = threading.Barrier(threads)
+
+        def prime(_):
+            client.prime()
+            barrier.wait()
+
+        list(pool.map(prime, range(threads)))
+
+        started = time.perf_counter()
+        for offset in range(0, len(schedule), burst):
+            list(pool.map(fire, schedule[offset:offset + burst]))
+            if pause:
+                time.sleep(pause)
+        elapsed = time.perf_counter() - started
+
+    return samples, elapsed
+
+
+def summarise(samples, elapsed, label, threads):
+    latencies = sorted(s[1] for s in samples)
+    per_scenario = {}
+    for scenario in sorted({s[0] for s in samples}):
+        rows = [s for s in samples if s[0] == scenario]
+        lat = sorted(r[1] for r in rows)
+        per_scenario[scenario] = {
+            "requests": len(rows),
+            "admitted": sum(1 for r in rows if r[4]),
+            "outcomes": dict(Counter(r[3] for r in rows)),
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+        }
+    return {
+        "target": label,
+        "threads": threads,
+        "requests": len(samples),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0,
+        "http_errors": sum(1 for s in samples if s[2] != 200),
+        "scenarios": per_scenario,
+    }
+
+
+def print_report(report):
+    print(f"\n=== {report['target']} ({report['threads']} threads) ===")
+    print(f"Requests: {report['requests']}  in {report['elapsed_s']}s  ->  {report['throughput_rps']} req/s")
+    print(f"Latency ms: p50={report['p50_ms']}  p95={report['p95_ms']}  p99={report['p99_ms']}  max={report['max_ms']}")
+    print(f"HTTP errors: {report['http_errors']}")
+    print(f"{'scenario':<12}{'reqs':>7}{'admitted':>10}{'p50':>9}{'p95':>9}  outcomes")
+    for name, row in report["scenarios"].items():
+        print(f"{name:<12}{row['requests']:>7}{row['admitted']:>10}{row['p50_ms']:>9}{row['p95_ms']:>9}  {row['outcomes']}")
+
+
+def run_single(args, database_url):
+    # Config reads DATABASE_URL at import time, so set it before importing the app
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    from src.app import app
+
+    total = args.requests
+    counts = {
+        "valid": max(1, int(total * args.mix["valid"])),
+        "grace": max(1, min(200, int(total * args.mix["grace"]))),
+        "expired": max(1, min(200, int(total * args.mix["expired"]))),
+    }
+    if args.url:
+        secret = args.kiosk_secret or app.config.get("KIOSK_SECRET_TOKEN")
+        client, label = HttpClient(args.url, secret), f"{args.url} [{app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]}]"
+    else:
+        client, label = InProcessClient(app), f"in-process [{app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]}]"
+
+    existing = other_members(app)
+    if existing and not args.force:
+        raise SystemExit(f"Refusing to load-test a database with {existing} real members "
+                         f"({app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}); use a throwaway database or --force.")
+
+    cleanup_members(app)
+    codes = seed_members(app, counts)
+    try:
+        schedule = build_schedule(total, args.mix, codes)
+        samples, elapsed = run_load(client, schedule, args.threads, args.burst, args.pause)
+    finally:
+        if not args.keep:
+            cleanup_members(app)
+    return summarise(samples, elapsed, label, args.threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay kiosk check-in traffic and report latency percentiles.")
+    parser.add_argument("--requests", type=int, default=1000, help="total check-in requests")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent clients (main.py serves with threads=8)")
+    parser.add_argument("--burst", type=int, default=50, help="requests fired per burst")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between bursts")
+    parser.add_argument("--db", action="append", default=[], help="DATABASE_URL to test; repeat to compare SQLite/PostgreSQL")
+    parser.add_argument("--url", help="hit a running server over HTTP instead of in-process")
+    parser.add_argument("--kiosk-secret", default=os.environ.get("KIOSK_SECRET"))
+    parser.add_argument("--mix", type=json.loads, default=DEFAULT_MIX, help='JSON scenario shares, e.g. \'{"valid":0.8,"grace":0.1,"expired":0.05,"double_tap":0.05}\'')
+    parser.add_argument("--keep", action="store_true", help="keep seeded LOADTEST_ members afterwards")
+    parser.add_argument("--force", action="store_true", help="run even if the database already has other members (never production)")
+    parser.add_argument("--json", action="store_true", help="print the report(s) as JSON")
+    args = parser.parse_args()
+
+    if len(args.db) > 1:
+        # One subprocess per database: the app binds its engine at import time
+        reports = []
+        for url in args.db:
+            cmd = [sys.executable, __file__, "--json", "--db", url,
+                   "--requests", str(args.requests), "--threads", str(args.threads),
+                   "--burst", str(args.burst), "--pause", str(args.pause), "--mix", json.dumps(args.mix)]
+            if args.url:
+                cmd += ["--url", args.url]
+            if args.keep:
+                cmd.append("--keep")
+            if args.force:
+                cmd.append("--force")
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+            reports.append(json.loads(out.strip().splitlines()[-1])[0])
+    else:
+        url = args.db[0] if args.db else None
+        if not url and not args.url and "DATABASE_URL" not in os.environ:
+            url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ironlifter_load_'), 'load.db')}"
+        reports = [run_single(args, url)]
+
+    if args.json:
+        print(json.dumps(reports))
+    else:
+        for report in reports:
+            print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,12 +14,13 @@ with app.app_context():
         db.session.commit()
 
     print("Generating 50 dummy members...")
+    codes = Member.generate_unique_codes(50)
     
     for i in range(1, 51):
         # Create Dummy Member
         join_date = date.today() - timedelta(days=random.randint(0, 365))
         member = Member(
-            member_code=Member.generate_unique_code(),
+            member_code=codes[i - 1],
             name=f"Test Member {i}",
             phone=f"98765432{i:02d}",
             email=f"member{i}@test.com",
@@ -6,6 +6,7 @@ from flask_wtf.csrf import CSRFProtect
 from src.config import Config
 from src.models import db, User, init_db
 from src.utils.helpers import format_date, format_datetime, format_currency
+from src.utils.image_pipeline import photo_url
 
 def create_app():
     app = Flask(__name__, template_folder="templates", static_folder="static")
@@ -28,6 +29,7 @@ def create_app():
     app.jinja_env.filters["format_date"] = format_date
     app.jinja_env.filters["format_datetime"] = format_datetime
     app.jinja_env.filters["format_currency"] = format_currency
+    app.jinja_env.filters["photo_url"] = photo_url
     
     @app.context_processor
     def inject_globals():
@@ -60,6 +62,60 @@ def create_app():
     app.register_blueprint(settings, url_prefix="/settings")
     
     init_db(app)
+
+    # Warm the check-in caches so the first kiosk taps don't pay for it
+    from src.utils.checkin_cooldown import checkin_cooldown
+    from src.utils.daily_stats import ensure_built, rebuild_daily_stats_command
+    from src.utils import rollups
+    app.cli.add_command(rebuild_daily_stats_command)
+    app.cli.add_command(rollups.backfill_report_rollups_command)
+    with app.app_context():
+        try:
+            checkin_cooldown.warm()
+        except Exception as e:
+            print(f"WARNING: Could not warm check-in cooldown cache: {e}")
+        try:
+            ensure_built()
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: Could not build daily_stats rollup: {e}")
+        try:
+            rollups.ensure_built()
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: Could not backfill report rollups: {e}")
+
+    # Member full-text search index (FTS5 / pg_trgm), built on first start
+    from src.utils.member_search import ensure_index as ensure_member_search, rebuild_member_search_command
+    app.cli.add_command(rebuild_member_search_command)
+    from src.utils.member_import import import_members_command
+    app.cli.add_command(import_members_command)
+    from src.utils.code_allocator import member_codes_command
+    app.cli.add_command(member_codes_command)
+    with app.app_context():
+        try:
+            if ensure_member_search():
+                print("INFO: Member search index ready.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: Could not build member search index (falling back to ILIKE): {e}")
+
+    # Typeahead prefix index lives in memory; build it before the first keystroke
+    from src.utils.typeahead import member_typeahead
+    with app.app_context():
+        try:
+            member_typeahead.build()
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: Could not build member typeahead index: {e}")
+
+    # Heavy reports run on a separate worker pool (see src.utils.jobs)
+    from src.utils.jobs import job_runner
+    from src.utils import report_jobs  # registers the report kinds
+    try:
+        job_runner.init_app(app)
+    except Exception as e:
+        print(f"WARNING: Could not start report job runner: {e}")
     return app
 
 app = create_app()
@@ -17,12 +17,30 @@ class Config:
     ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
     
     KIOSK_SECRET_TOKEN = os.environ.get("KIOSK_SECRET", "ironlifter_kiosk_secret_99")
+    # HMAC key for member card QR tokens (falls back to SECRET_KEY); rotating it voids printed cards
+    QR_TOKEN_SECRET = os.environ.get("QR_TOKEN_SECRET")
+    QR_TOKEN_TTL_DAYS = int(os.environ.get("QR_TOKEN_TTL_DAYS", 730))
     GRACE_PERIOD_DAYS = int(os.environ.get("GRACE_PERIOD", 5))
+    # Oldest offline kiosk check-in /api/checkin/batch will still replay
+    KIOSK_MAX_OFFLINE_HOURS = int(os.environ.get("KIOSK_MAX_OFFLINE_HOURS", 72))
+    # Minimum width of new member codes (5 -> 10000-99999); raise it before the space runs low
+    MEMBER_CODE_DIGITS = int(os.environ.get("MEMBER_CODE_DIGITS", 5))
+    # How long a computed retention cohort is reused before it is recomputed
+    COHORT_CACHE_SECONDS = int(os.environ.get("COHORT_CACHE_SECONDS", 900))
     
     TELEGRAM_TOKEN = os.environ.get("TG_TOKEN", "")
     TELEGRAM_CHAT_ID = os.environ.get("TG_CHAT_ID", "")
     
+    # Live check-in stream (SSE). Each open stream holds one waitress thread,
+    # so keep this well below the thread count in main.py.
+    SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", 3))
+    SSE_STREAM_SECONDS = int(os.environ.get("SSE_STREAM_SECONDS", 300))
+
+    # Background report jobs run on their own small pool, off the request threads
+    REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 2))
+    REPORT_CACHE_SECONDS = int(os.environ.get("REPORT_CACHE_SECONDS", 3600))
+    
     LICENSE_HOLDER = os.environ.get("LICENSE_HOLDER", "IRONLIFTER GYM")
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "uploads")
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
-    ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+    ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
@@ -1,15 +1,16 @@
-import secrets
 import string
 from flask_login import UserMixin
 from datetime import datetime, date, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import inspect, text
+from sqlalchemy import case, inspect, text, event, func
 
 # 1. Import db from extensions
 from src.extensions import db
 
 # Constants
-MEMBER_CODE_LENGTH = 5
+# Column width for member codes; new codes are MEMBER_CODE_DIGITS wide (5 by default,
+# wider once the 5-digit space is used up, see src.utils.code_allocator)
+MEMBER_CODE_LENGTH = 10
 
 # 2. Import Staff models from the separate file
 # (We import StaffAttendance, not Attendance)
@@ -46,10 +47,23 @@ class Plan(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     members = db.relationship('Member', backref='plan', lazy='dynamic')
 
+def _first_join_default(context):
+    return context.get_current_parameters().get('join_date') or date.today()
+
 class Member(db.Model):
     __tablename__ = 'members'
+    __table_args__ = (
+        # Sort keys of the keyset-paginated member list (src.utils.pagination)
+        db.Index('ix_members_name', 'name'),
+        db.Index('ix_members_join_date', 'join_date'),
+        db.Index('ix_members_first_join_date', 'first_join_date'),
+        db.Index('ix_members_expiry_date', 'expiry_date'),
+        # Derived-state filters (expiring / grace / expired are status + expiry ranges) and plan filter
+        db.Index('ix_members_status_expiry', 'status', 'expiry_date'),
+        db.Index('ix_members_plan_id', 'plan_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    # Public-facing 5-digit member code (e.g. 12345). Unique and indexed.
+    # Public-facing numeric member code (e.g. 12345). Unique and indexed.
     member_code = db.Column(db.String(MEMBER_CODE_LENGTH), unique=True, index=True)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
@@ -64,6 +78,8 @@ class Member(db.Model):
     plan_id = db.Column(db.Integer, db.ForeignKey('plans.id'))
     plan_price_at_join = db.Column(db.Integer)
     join_date = db.Column(db.Date, default=date.today)
+    # Start of the first membership: join_date moves on every renewal, this never does (retention cohorts)
+    first_join_date = db.Column(db.Date, default=_first_join_default)
     expiry_date = db.Column(db.Date)
     status = db.Column(db.String(20), default='Active')
     notes = db.Column(db.Text)
@@ -92,11 +108,27 @@ class Member(db.Model):
 
     @staticmethod
     def generate_unique_code():
-        """Generate a unique 5-digit numeric member_code (10000-99999)."""
-        while True:
-            code = str(secrets.randbelow(90000) + 10000)  # 10000-99999
-            if not Member.query.filter_by(member_code=code).first():
-                return code
+        """Next unused member_code from the shared allocator (src.utils.code_allocator)."""
+        from src.utils.code_allocator import allocate_codes
+        return allocate_codes(1)[0]
+
+    @staticmethod
+    def generate_unique_codes(count):
+        """`count` unused member codes reserved in one step (bulk imports)."""
+        from src.utils.code_allocator import allocate_codes
+        return allocate_codes(count)
+
+class CodeSequence(db.Model):
+    """
+    Allocation state of a permuted code sequence: index `next_index` of a
+    keyed permutation over the `digits`-wide code space is the next code
+    handed out (see src.utils.code_allocator).
+    """
+    __tablename__ = 'code_sequences'
+    name = db.Column(db.String(30), primary_key=True)
+    digits = db.Column(db.Integer, nullable=False)
+    next_index = db.Column(db.BigInteger, nullable=False, default=0)
+    key = db.Column(db.String(32), nullable=False)  # hex permutation key, random per database
 
 class Measurement(db.Model):
     __tablename__ = 'measurements'
@@ -117,14 +149,29 @@ class Measurement(db.Model):
 # This is MEMBER Attendance (separate from StaffAttendance)
 class Attendance(db.Model):
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # Day-scoped pages (dashboard, /attendance, reports) filter on `date`;
+        # the cooldown / per-member history uses (member_id, timestamp).
+        db.Index('ix_attendance_date', 'date'),
+        db.Index('ix_attendance_member_timestamp', 'member_id', 'timestamp'),
+        db.Index('ix_attendance_timestamp', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     member_id = db.Column(db.Integer, db.ForeignKey('members.id'), nullable=True)
     # Removing staff_id from here since staff track their attendance in the 'staff_attendance' table
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Local time, same clock as the dashboard's "today" boundaries
+    timestamp = db.Column(db.DateTime, default=datetime.now)
     check_type = db.Column(db.String(10), default='in')
+    # Always the calendar day of `timestamp` (set in before_insert below)
     date = db.Column(db.Date, default=date.today)
     status = db.Column(db.String(20)) 
 
+@event.listens_for(Attendance, 'before_insert')
+def _attendance_fill_date(mapper, connection, target):
+    if target.timestamp is None:
+        target.timestamp = datetime.now()
+    target.date = target.timestamp.date()
+
 # --- EQUIPMENT ---
 class Equipment(db.Model):
     __tablename__ = 'equipment'
@@ -184,6 +231,54 @@ class Revenue(db.Model):
     amount = db.Column(db.Integer, nullable=False)
     date = db.Column(db.Date, default=date.today)
 
+# --- ROLLUPS ---
+class DailyStats(db.Model):
+    """One row per calendar day, maintained by src.utils.daily_stats in the same transaction as the source rows."""
+    __tablename__ = 'daily_stats'
+    date = db.Column(db.Date, primary_key=True)
+    checkins = db.Column(db.Integer, nullable=False, default=0)
+    new_members = db.Column(db.Integer, nullable=False, default=0)
+    renewals = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+
+class RevenueRollup(db.Model):
+    """Transaction totals per day/month x plan x payment method x transaction type (see src.utils.rollups)."""
+    __tablename__ = 'revenue_rollups'
+    # Grain columns are NOT NULL ('' / 0 stand in for "none") so the unique key works for upserts
+    granularity = db.Column(db.String(5), primary_key=True)  # 'day' or 'month'
+    period = db.Column(db.Date, primary_key=True)
+    plan_id = db.Column(db.Integer, primary_key=True, default=0)
+    payment_method = db.Column(db.String(50), primary_key=True, default='')
+    transaction_type = db.Column(db.String(50), primary_key=True, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    tx_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ExpenseRollup(db.Model):
+    """Expense totals per day/month x category (see src.utils.rollups)."""
+    __tablename__ = 'expense_rollups'
+    granularity = db.Column(db.String(5), primary_key=True)
+    period = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    tx_count = db.Column(db.Integer, nullable=False, default=0)
+
+# --- BACKGROUND JOBS ---
+class ReportJob(db.Model):
+    """A report computed off the request threads by src.utils.jobs; `result` is a JSON blob."""
+    __tablename__ = 'report_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    # sha256 of kind + canonical params: identical requests share one job / cached result
+    params_key = db.Column(db.String(64), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
 def init_db(app):
     with app.app_context():
         db.create_all()
@@ -200,12 +295,72 @@ def init_db(app):
             db.session.rollback()
             print(f"WARNING: Could not ensure member_code column exists: {e}")
 
-        # Ensure every member has a unique 5-digit member_code
+        # first_join_date anchors retention cohorts; older DBs only have join_date, which renewals overwrite
+        try:
+            cols = [c['name'] for c in inspect(db.engine).get_columns('members')]
+            if 'first_join_date' not in cols:
+                print("INFO: Adding first_join_date column to members table...")
+                db.session.execute(text("ALTER TABLE members ADD COLUMN first_join_date DATE"))
+                db.session.commit()
+            first_payment = db.session.query(func.min(Transaction.date)).filter(
+                Transaction.member_id == Member.id, Transaction.transaction_type == 'New Membership'
+            ).scalar_subquery()
+            created = func.date(Member.created_at)
+            fallback = case((created < Member.join_date, created), else_=Member.join_date)
+            fixed = db.session.query(Member).filter(Member.first_join_date == None).update(
+                {Member.first_join_date: func.coalesce(func.date(first_payment), fallback)}, synchronize_session=False)
+            db.session.commit()
+            if fixed:
+                print(f"INFO: Backfilled first_join_date for {fixed} members.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: Could not backfill first_join_date: {e}")
+
+        # Member list sort / filter indexes (older DBs were created without them)
+        try:
+            for index in Member.__table__.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+        except Exception as e:
+            print(f"WARNING: Could not create member indexes: {e}")
+
+        # Attendance indexes + `date` backfill (older DBs were created without them)
+        try:
+            existing = {ix['name'] for ix in inspect(db.engine).get_indexes('attendance')}
+            first_run = 'ix_attendance_date' not in existing
+            for index in Attendance.__table__.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+
+            stale = Attendance.date == None
+            if first_run:
+                # One-off full pass: `date` used to hold the insert day, not the timestamp's day
+                stale = stale | (Attendance.date != func.date(Attendance.timestamp))
+            fixed = db.session.query(Attendance).filter(
+                Attendance.timestamp != None, stale
+            ).update({Attendance.date: func.date(Attendance.timestamp)}, synchronize_session=False)
+            db.session.commit()
+            if fixed:
+                print(f"INFO: Backfilled attendance.date for {fixed} rows.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: Could not prepare attendance indexes: {e}")
+
+        # member_code used to be VARCHAR(5); widen it so longer codes fit (SQLite ignores lengths)
+        if db.engine.dialect.name == 'postgresql':
+            try:
+                column = next(c for c in inspect(db.engine).get_columns('members') if c['name'] == 'member_code')
+                if (getattr(column['type'], 'length', None) or MEMBER_CODE_LENGTH) < MEMBER_CODE_LENGTH:
+                    db.session.execute(text(f"ALTER TABLE members ALTER COLUMN member_code TYPE VARCHAR({MEMBER_CODE_LENGTH})"))
+                    db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"WARNING: Could not widen member_code column: {e}")
+
+        # Ensure every member has a unique member_code (one batch reservation for all of them)
         missing_codes = Member.query.filter((Member.member_code == None) | (Member.member_code == '')).all()
         if missing_codes:
             print(f"INFO: Assigning member_code for {len(missing_codes)} existing members...")
-            for m in missing_codes:
-                m.member_code = Member.generate_unique_code()
+            for m, code in zip(missing_codes, Member.generate_unique_codes(len(missing_codes))):
+                m.member_code = code
             db.session.commit()
 
         if not User.query.filter_by(role='admin').first():
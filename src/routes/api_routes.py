@@ -1,9 +1,27 @@
-from flask import request, jsonify, current_app
+import queue
+import time
+from flask import request, jsonify, current_app, Response, url_for
 from datetime import date, datetime, timedelta
 from functools import wraps
+from collections import Counter
+from flask_login import login_required
 from . import api
-from src.models import db, Member, Plan, Attendance
+from src.models import db, Plan, Attendance, ReportJob
 from src.utils.helpers import send_telegram_alert
+from src.utils.qr_token import resolve_scan, is_token
+from src.utils.daily_stats import bump as bump_daily_stats
+from src.utils.notifier import telegram_dispatcher
+from src.utils.image_pipeline import photo_url as member_photo_url
+from src.utils.event_broker import checkin_broker, format_sse, publish_checkin
+from src.utils.checkin_cooldown import checkin_cooldown, COOLDOWN as CHECKIN_COOLDOWN
+from src.utils.peak_hours import peak_hours, WINDOWS as PEAK_WINDOWS
+from src.utils.jobs import job_runner, serialize as serialize_job
+from src.utils.series_cache import series_cache
+from src.utils.attendance_columns import summary as attendance_summary
+from src.utils.typeahead import member_typeahead
+
+# Max entries accepted by a single /api/checkin/batch call
+MAX_BATCH_CHECKINS = 500
 
 # Kiosk token decorator to ensure only authorized kiosk clients can call /api/checkin
 
@@ -17,45 +35,19 @@ def kiosk_token_required(f):
         return f(*args, **kwargs)
     return wrapper
 
-@api.route('/checkin', methods=['POST'])
-@kiosk_token_required
-def checkin():
-    # 1. INPUT VALIDATION (ID or Phone)
-    data = request.get_json()
-    identifier = str(data.get('member_id', '')).strip()
-    
-    if not identifier:
-        return jsonify({'success': False, 'message': 'Please enter Member ID or Phone'})
-
-    # Try finding by member_code first (numeric or string), then by internal ID, then by phone
-    member = Member.query.filter_by(member_code=identifier).first()
-
-    if not member and identifier.isdigit():
-        num = int(identifier)
-        member = Member.query.get(num)
-    
-    # If not found by ID, try Phone
-    if not member:
-        member = Member.query.filter_by(phone=identifier).first()
-
-    if not member:
-        return jsonify({'success': False, 'message': 'Member not found'})
-    
-    if member.status != 'Active':
-        return jsonify({'success': False, 'message': 'Access Denied: Account Inactive'})
-
-    # 2. MEMBERSHIP LOGIC (The 4 States)
+def membership_state(member, on_date, grace_days):
+    """
+    Applies the 4-state membership rules (blocked / grace / due_soon / ok)
+    for a check-in happening on `on_date`. Shared by the live and batch paths.
+    """
     days_left = 100
     if member.expiry_date:
-        days_left = (member.expiry_date - date.today()).days
-
-    # Use configurable grace period from config (default 3 if not set)
-    grace_days = current_app.config.get('GRACE_PERIOD_DAYS', 3)
+        days_left = (member.expiry_date - on_date).days
 
     success = True
     status_code = 'ok'  # ok, grace, due_soon, blocked
     title = f"WELCOME, {member.name.split(' ')[0].upper()}"
-    message = f"Plan: {member.plan.name if member.plan else 'Standard'}"
+    message = f"Plan: {member.plan_name or 'Standard'}"
     due_warning = None
 
     # STATE 1: BLOCKED (Overdue > grace_days)
@@ -75,7 +67,7 @@ def checkin():
     # STATE 2: GRACE PERIOD (expired but within configured grace window)
     elif days_left < 0:
         status_code = 'grace'
-        title = "ACCESS GRANTED" 
+        title = "ACCESS GRANTED"
         if days_left == -1:
             due_warning = "⚠ NOTE: Your plan expired yesterday. Please renew soon!"
         else:
@@ -94,24 +86,65 @@ def checkin():
 
     # STATE 4: STANDARD WELCOME -> status_code remains 'ok'
 
-    # 3. PREVENT DOUBLE TAPS (1 Hour Cooldown)
+    return {
+        'success': success,
+        'status': status_code,
+        'title': title,
+        'message': message,
+        'due_warning': due_warning,
+        'days_left': days_left,
+    }
+
+@api.route('/checkin', methods=['POST'])
+@kiosk_token_required
+def checkin():
+    # 1. INPUT VALIDATION (ID or Phone)
+    data = request.get_json()
+    identifier = str(data.get('member_id', '')).strip()
+
+    if not identifier:
+        return jsonify({'success': False, 'message': 'Please enter Member ID or Phone'})
+
+    # Signed card tokens verify to a member id directly; typed input uses the identity index
+    member = resolve_scan(identifier)
+
+    if not member:
+        if is_token(identifier):
+            return jsonify({'success': False, 'message': 'Card not recognised or expired'})
+        return jsonify({'success': False, 'message': 'Member not found'})
+
+    if member.status != 'Active':
+        return jsonify({'success': False, 'message': 'Access Denied: Account Inactive'})
+
+    # 2. MEMBERSHIP LOGIC (The 4 States)
+    # Use configurable grace period from config (default 3 if not set)
+    grace_days = current_app.config.get('GRACE_PERIOD_DAYS', 3)
+    state = membership_state(member, date.today(), grace_days)
+    success = state['success']
+    due_warning = state['due_warning']
+
+    # 3. PREVENT DOUBLE TAPS (1 Hour Cooldown, answered from the in-memory cache)
     if success:
-        one_hour_ago = datetime.now() - timedelta(hours=1)
-        recent = Attendance.query.filter(
-            Attendance.member_id == member.id,
-            Attendance.timestamp >= one_hour_ago
-        ).first()
-        
+        now = datetime.now()
+        recent = checkin_cooldown.claim(member.id, now)
+
         if recent:
             return jsonify({
-                'success': False, 
-                'message': f"Already checked in at {recent.timestamp.strftime('%I:%M %p')}"
+                'success': False,
+                'message': f"Already checked in at {recent.strftime('%I:%M %p')}"
             })
-        
-        new_attendance = Attendance(member_id=member.id)
-        db.session.add(new_attendance)
-        db.session.commit()
-        
+
+        try:
+            new_attendance = Attendance(member_id=member.id, timestamp=now)
+            db.session.add(new_attendance)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            checkin_cooldown.release(member.id, now)
+            raise
+
+        publish_checkin(member, now, 'kiosk')
+
         try:
             alert_msg = f"✅ KIOSK: {member.name}"
             if due_warning: alert_msg += f"\n⚠ {due_warning}"
@@ -122,15 +155,258 @@ def checkin():
     # 4. PREPARE PHOTO URL
     photo_url = '/static/img/default_user.png'
     if member.photo_path:
-        photo_url = f"/static/uploads/{member.photo_path}"
+        photo_url = member_photo_url(member.photo_path, 'kiosk')
 
     return jsonify({
         'success': success,
-        'status': status_code,
+        'status': state['status'],
         'member_name': member.name,
         'photo_url': photo_url,
-        'plan': member.plan.name if member.plan else 'N/A',
-        'message': message,
+        'plan': member.plan_name or 'N/A',
+        'message': state['message'],
         'due_warning': due_warning,
-        'days_left': days_left
+        'days_left': state['days_left']
+    })
+
+def _parse_checkin_time(value):
+    """Parses an ISO-8601 kiosk timestamp into a naive local datetime."""
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)
+    return ts
+
+@api.route('/checkin/batch', methods=['POST'])
+@kiosk_token_required
+def checkin_batch():
+    """
+    Replays check-ins a kiosk buffered while offline.
+
+    Body: {"checkins": [{"member_id": "12345", "timestamp": "2025-01-31T06:02:11", "client_id": "..."}]}
+    Each entry is judged against the membership state on the day of the tap,
+    and all accepted rows are written with a single bulk INSERT. Taps older
+    than KIOSK_MAX_OFFLINE_HOURS are rejected as 'stale'.
+    """
+    data = request.get_json(silent=True)
+    entries = data.get('checkins') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return jsonify({'success': False, 'message': 'Expected a list of check-ins'}), 400
+    if len(entries) > MAX_BATCH_CHECKINS:
+        return jsonify({'success': False, 'message': f'Batch too large (max {MAX_BATCH_CHECKINS})'}), 413
+
+    grace_days = current_app.config.get('GRACE_PERIOD_DAYS', 3)
+    now = datetime.now()
+    oldest = now - timedelta(hours=current_app.config.get('KIOSK_MAX_OFFLINE_HOURS', 72))
+    results = [None] * len(entries)
+    pending = []  # (index, member, timestamp, state)
+
+    # 1. VALIDATE & RESOLVE EACH ENTRY
+    for idx, entry in enumerate(entries):
+        entry = entry if isinstance(entry, dict) else {}
+        result = {'index': idx, 'client_id': entry.get('client_id'), 'success': False}
+        results[idx] = result
+
+        identifier = str(entry.get('member_id', '')).strip()
+        ts = _parse_checkin_time(entry.get('timestamp'))
+        if not identifier or not ts:
+            result.update(status='invalid', message='Missing member ID or timestamp')
+            continue
+        if ts > now + timedelta(minutes=5):
+            result.update(status='invalid', message='Timestamp is in the future')
+            continue
+        if ts < oldest:
+            result.update(status='stale', message='Check-in is older than the kiosk offline window')
+            continue
+
+        member = resolve_scan(identifier)
+        if not member:
+            result.update(status='not_found', message='Member not found')
+            continue
+        if member.status != 'Active':
+            result.update(status='inactive', message='Access Denied: Account Inactive')
+            continue
+
+        state = membership_state(member, ts.date(), grace_days)
+        result.update(member_name=member.name, status=state['status'], message=state['message'])
+        if state['success']:
+            pending.append((idx, member, ts, state))
+
+    # 2. COOLDOWN: one query for every existing check-in near the batch window
+    last_seen = {}
+    if pending:
+        member_ids = {member.id for _, member, _, _ in pending}
+        window_start = min(ts for _, _, ts, _ in pending) - CHECKIN_COOLDOWN
+        window_end = max(ts for _, _, ts, _ in pending) + CHECKIN_COOLDOWN
+        existing = db.session.query(Attendance.member_id, Attendance.timestamp).filter(
+            Attendance.member_id.in_(member_ids),
+            Attendance.timestamp.between(window_start, window_end)
+        ).all()
+        for member_id, ts in existing:
+            last_seen.setdefault(member_id, []).append(ts)
+
+    rows = []
+    accepted = []
+    for idx, member, ts, state in sorted(pending, key=lambda p: p[2]):
+        seen = last_seen.setdefault(member.id, [])
+        clash = next((s for s in seen if abs(s - ts) < CHECKIN_COOLDOWN), None)
+        if clash:
+            results[idx].update(status='duplicate', message=f"Already checked in at {clash.strftime('%I:%M %p')}")
+            continue
+        seen.append(ts)
+        rows.append({'member_id': member.id, 'timestamp': ts, 'date': ts.date(), 'check_type': 'in'})
+        accepted.append((member, ts))
+        results[idx]['success'] = True
+
+    # 3. SINGLE BULK INSERT + COMMIT
+    if rows:
+        db.session.execute(db.insert(Attendance), rows)
+        # ORM bulk inserts skip mapper events, so roll the counters up here (same transaction)
+        per_day = Counter(row['date'] for row in rows)
+        for day, count in per_day.items():
+            bump_daily_stats(db.session.connection(), day, checkins=count)
+        db.session.commit()
+        # Core bulk inserts bypass the ORM events, so feed the in-memory caches directly
+        for row in rows:
+            checkin_cooldown.record(row['member_id'], row['timestamp'])
+            peak_hours.record(row['timestamp'])
+        for day in per_day:
+            if day < date.today():
+                series_cache.invalidate_day(day)
+        for member, ts in accepted:
+            publish_checkin(member, ts, 'kiosk_sync')
+
+        try:
+            send_telegram_alert(f"📶 KIOSK SYNC: {len(rows)} offline check-in(s) uploaded")
+        except:
+            pass
+
+    return jsonify({
+        'success': True,
+        'accepted': len(rows),
+        'rejected': len(entries) - len(rows),
+        'results': results
+    })
+
+@api.route('/notifications/stats')
+@login_required
+def notification_stats():
+    """Queue depth, drop count and send latency of the Telegram dispatcher."""
+    return jsonify(telegram_dispatcher.stats())
+
+@api.route('/peak-hours')
+@login_required
+def peak_hours_histogram():
+    """Weekday x hour check-in histogram for the last ?days= (7, 30, 90 or 365) days."""
+    days = request.args.get('days', 30, type=int)
+    if days not in PEAK_WINDOWS:
+        return jsonify({'success': False, 'message': f"days must be one of {list(PEAK_WINDOWS)}"}), 400
+    return jsonify({'success': True, **peak_hours.matrix(days)})
+
+@api.route('/members/typeahead')
+@login_required
+def member_typeahead_lookup():
+    """Top matches for ?q= from the in-memory prefix index (no DB query per keystroke)."""
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    started = time.perf_counter()
+    matches = member_typeahead.suggest(query, limit)
+    took_us = int((time.perf_counter() - started) * 1_000_000)
+    return jsonify({
+        'success': True,
+        'took_us': took_us,
+        'results': [{
+            'id': s.id,
+            'code': s.member_code,
+            'name': s.name,
+            'phone': s.phone,
+            'status': s.status,
+            'expiry_date': s.expiry_date.isoformat() if s.expiry_date else None,
+            'photo_url': member_photo_url(s.photo_path, 'thumb'),
+            'url': url_for('members.view_member', id=s.id),
+        } for s in matches]
+    })
+
+@api.route('/analytics/attendance')
+@login_required
+def attendance_analytics():
+    """
+    Hourly counts, distinct attendees and visit frequency for ?start=&end=
+    (default: last 30 days), answered from the in-memory attendance columns.
+    """
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else date.today()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+    if end < start:
+        return jsonify({'success': False, 'message': 'start must be on or before end'}), 400
+    return jsonify({'success': True, **attendance_summary(start, end)})
+
+@api.route('/reports/jobs', methods=['POST'])
+@login_required
+def submit_report_job():
+    """
+    Queue a heavy report: {"kind": "revenue_trend", "params": {...}}.
+    Identical requests return the cached result or the job already running.
+    """
+    data = request.get_json(silent=True) or {}
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'success': False, 'message': 'params must be an object'}), 400
+    try:
+        job = job_runner.submit(data.get('kind'), params)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **serialize_job(job)}), 200 if job.status == 'done' else 202
+
+@api.route('/reports/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    """Poll a report job: status, progress (0-100) and the result once done."""
+    job = db.session.get(ReportJob, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, **serialize_job(job)})
+
+@api.route('/stream/checkins')
+@login_required
+def checkin_stream():
+    """
+    Server-Sent Events feed of check-ins for the dashboard / attendance pages.
+
+    Streams are capped (SSE_MAX_STREAMS) and recycled after SSE_STREAM_SECONDS
+    so they can never tie up all of waitress's worker threads; the browser's
+    EventSource reconnects and replays missed events via Last-Event-ID.
+    """
+    checkin_broker.max_subscribers = current_app.config.get('SSE_MAX_STREAMS', 3)
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    sub = checkin_broker.subscribe(last_event_id)
+    if sub is None:
+        return jsonify({'success': False, 'message': 'Too many live streams open'}), 503
+
+    lifetime = current_app.config.get('SSE_STREAM_SECONDS', 300)
+
+    def stream():
+        deadline = time.monotonic() + lifetime
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    event = sub.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            checkin_broker.unsubscribe(sub)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
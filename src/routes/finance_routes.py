@@ -2,8 +2,9 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for
 from flask_login import login_required
 from datetime import datetime, date
 import calendar
-from sqlalchemy import func, and_
+from sqlalchemy import and_
 from src.models import db, Expense, Transaction, Member, Plan  # Import Member and Plan
+from src.utils import rollups
 
 finance_bp = Blueprint('finance', __name__)
 
@@ -29,14 +30,11 @@ def finance_dashboard():
         end_date = date.today()
         month_display = date.today().strftime('%B %Y')
 
-    # 3. CALCULATE TOTALS
-    total_revenue = db.session.query(func.sum(Transaction.amount)).filter(
-        and_(Transaction.date >= start_date, Transaction.date <= end_date)
-    ).scalar() or 0
-    
-    total_expenses = db.session.query(func.sum(Expense.amount)).filter(
-        and_(Expense.date >= start_date, Expense.date <= end_date)
-    ).scalar() or 0
+    # 3. CALCULATE TOTALS (from the month rollups, not the raw tables)
+    total_revenue = rollups.revenue_total(start_date, end_date)
+    total_expenses = rollups.expense_total(start_date)
+    revenue_by_method = rollups.revenue_breakdown(start_date, 'payment_method')
+    expenses_by_category = rollups.expense_breakdown(start_date)
 
     # 4. FETCH TRANSACTIONS WITH PLAN NAMES
     # We join Transaction -> Member -> Plan to get the plan name
@@ -64,6 +62,8 @@ def finance_dashboard():
         profit=total_revenue - total_expenses,
         income=total_revenue, 
         expense=total_expenses, 
+        revenue_by_method=revenue_by_method,
+        expenses_by_category=expenses_by_category,
         expenses=expenses,
         transactions=transactions_data, # Passing the joined data
         selected_month=filter_month,
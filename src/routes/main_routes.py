@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, send_file, abort
+from werkzeug.utils import secure_filename
 from flask_login import login_required
-from datetime import date, datetime, timedelta, time
-from sqlalchemy import func
-from src.models import db, Member, Plan, Attendance, Transaction
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, case
+from src.models import db, Member, Plan, Attendance
+from src.utils.qr_token import resolve_scan
+from src.utils import daily_stats
+from src.utils.event_broker import publish_checkin
+from src.utils.image_pipeline import parse_rendition_name, rendition_path
 
 # --- Define the Blueprint ---
 main_bp = Blueprint('main', __name__)
@@ -11,23 +16,18 @@ main_bp = Blueprint('main', __name__)
 @login_required
 def dashboard():
     today = date.today()
-    today_start = datetime.combine(today, time.min)
-    today_end = datetime.combine(today, time.max)
-    
-    # --- 1. COUNTS ---
-    total_members = Member.query.count()
     
+    # --- 1. COUNTS (one pass over members) ---
     # FIX: Filter by status AND expiry_date to ensure we only count truly active members
     # (Previously it counted expired members if their status wasn't manually updated)
-    active_members = Member.query.filter(
-        Member.status == 'Active',
-        Member.expiry_date >= today
-    ).count()
+    total_members, active_members = db.session.query(
+        func.count(Member.id),
+        func.sum(case(((Member.status == 'Active') & (Member.expiry_date >= today), 1), else_=0))
+    ).one()
+    active_members = active_members or 0
     
-    # --- 2. ATTENDANCE ---
-    checkins_today = Attendance.query.filter(
-        Attendance.timestamp.between(today_start, today_end)
-    ).count()
+    # --- 2. ATTENDANCE (daily_stats rollup) ---
+    checkins_today = daily_stats.get_day(today).checkins
     
     # --- 3. UPCOMING DUES ---
     seven_days_out = today + timedelta(days=7)
@@ -54,7 +54,7 @@ def dashboard():
     ).outerjoin(
         Plan, Member.plan_id == Plan.id
     ).filter(
-        Attendance.timestamp.between(today_start, today_end)
+        Attendance.date == today
     ).order_by(Attendance.timestamp.desc()).limit(20).all()
     
     checkin_list = []
@@ -70,11 +70,9 @@ def dashboard():
             'plan_name': plan.name if plan else 'N/A'
         })
 
-    # --- 5. MONTHLY REVENUE ---
+    # --- 5. MONTHLY REVENUE (daily_stats rollup) ---
     first_of_month = today.replace(day=1)
-    current_month_revenue = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.date >= first_of_month
-    ).scalar() or 0
+    current_month_revenue = daily_stats.revenue_between(first_of_month)
     
     return render_template('dashboard.html',
         active_page='dashboard',
@@ -95,16 +93,13 @@ def attendance():
     except:
         filter_date = date.today()
         selected_date = filter_date.strftime('%Y-%m-%d')
-        
-    day_start = datetime.combine(filter_date, time.min)
-    day_end = datetime.combine(filter_date, time.max)
     
     logs = db.session.query(Attendance, Member, Plan).join(
         Member, Attendance.member_id == Member.id
     ).outerjoin(
         Plan, Member.plan_id == Plan.id
     ).filter(
-        Attendance.timestamp.between(day_start, day_end)
+        Attendance.date == filter_date
     ).order_by(Attendance.timestamp.desc()).all()
     
     attendance_logs = []
@@ -132,21 +127,15 @@ def attendance():
 def checkin_manual():
     identifier = request.form.get('identifier')
     
-    # Try finding member by member_code, then by ID, then by Phone
-    member = None
-    if identifier:
-        member = Member.query.filter_by(member_code=identifier).first()
-
-    if not member and identifier and identifier.isdigit():
-        member = Member.query.get(int(identifier))
-    
-    if not member:
-        member = Member.query.filter_by(phone=identifier).first()
+    # Accepts a scanned card token as well as a typed code / ID / phone
+    member = resolve_scan(identifier)
         
     if member:
-        new_attendance = Attendance(member_id=member.id, timestamp=datetime.now())
+        now = datetime.now()
+        new_attendance = Attendance(member_id=member.id, timestamp=now)
         db.session.add(new_attendance)
         db.session.commit()
+        publish_checkin(member, now, 'desk')
         flash(f'Checked in: {member.name}', 'success')
     else:
         flash('Member not found.', 'danger')
@@ -156,9 +145,25 @@ def checkin_manual():
 @main_bp.route('/kiosk')
 def kiosk_mode(): 
     api_secret = current_app.config.get('KIOSK_SECRET_TOKEN', '')
-    return render_template('kiosk.html', api_secret=api_secret)
+    return render_template('kiosk.html', api_secret=api_secret,
+                           max_offline_hours=current_app.config.get('KIOSK_MAX_OFFLINE_HOURS', 72))
+
+
+@main_bp.route('/media/members/<filename>')
+def member_media(filename):
+    # Rendition names are content-addressed, so browsers may cache them forever.
+    # Public on purpose: the kiosk is not logged in.
+    parsed = parse_rendition_name(secure_filename(filename))
+    if not parsed:
+        abort(404)
+    path = rendition_path(*parsed)
+    if not path:
+        abort(404)
+    response = send_file(path, mimetype='image/jpeg', max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 @main_bp.route("/test")
 def test():
-    return "Test route working"
+    return "Test route working"
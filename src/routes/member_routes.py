@@ -1,25 +1,26 @@
-from flask import render_template, request, redirect, url_for, flash, send_file, current_app, Response
+from flask import render_template, request, redirect, url_for, flash, current_app, Response
 from flask_login import login_required
 from datetime import date, datetime, timedelta
-from sqlalchemy import or_, cast, String
+from sqlalchemy import func
 from . import members
 from src.models import db, Member, Plan, Transaction, Measurement, Attendance
-from src.utils.helpers import send_telegram_alert, generate_invoice_number, allowed_file
+from src.utils.helpers import generate_invoice_number
 from src.utils.email_automation import EmailService
-import os
-
-@members.route("/")
-@login_required
-def list_members():
-    page = request.args.get("page", 1, type=int)
-    per_page = 10
-    
-    query = db.session.query(Member, Plan).outerjoin(Plan).order_by(Member.id.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    
-    today = date.today()
+from src.utils.image_pipeline import save_member_photo
+from src.utils import member_search, member_filters, member_import, member_bulk
+from src.utils.pagination import keyset_page, count_cache
+
+# Sort options for the member list: column and direction (each has an index)
+SORTS = {
+    "newest": (Member.id, True),
+    "name": (Member.name, False),
+    "joined": (Member.join_date, True),
+    "expiry": (Member.expiry_date, False),
+}
+
+def _member_rows(rows, today):
     members_list = []
-    for member, plan in pagination.items:
+    for member, plan in rows:
         days_left = 999
         if member.expiry_date:
             days_left = (member.expiry_date - today).days
@@ -36,13 +37,45 @@ def list_members():
             "photo_path": member.photo_path,
             "days_left": days_left
         })
-        
+    return members_list
+
+@members.route("/")
+@login_required
+def list_members():
+    per_page = 10
+    sort = request.args.get("sort", "newest")
+    if sort not in SORTS:
+        sort = "newest"
+    column, desc = SORTS[sort]
+
+    today = date.today()
+    filters = member_filters.parse(request.args)
+    where = member_filters.conditions(filters, today, current_app.config.get("GRACE_PERIOD_DAYS", 3))
+
+    # Keyset pages: the cursor is the edge row's (sort value, id), so deep pages don't OFFSET-scan
+    query = db.session.query(Member, Plan).outerjoin(Plan).filter(*where)
+    page = keyset_page(
+        query, column, Member.id, desc=desc,
+        after=request.args.get("after"), before=request.args.get("before"),
+        per_page=per_page, key=lambda row: (getattr(row[0], column.key), row[0].id),
+    )
+    # Shown as approximate; a fresh COUNT(*) per page view is what made deep lists slow
+    total = count_cache.get(
+        ("members", today) + tuple(sorted(filters.items())),
+        lambda: db.session.query(func.count(Member.id)).filter(*where).scalar()
+    )
+
     plans = Plan.query.filter_by(is_active=True).all()
     
     return render_template("members.html",
         active_page="members",
-        members=members_list,
-        pagination=pagination,
+        members=_member_rows(page.items, today),
+        page=page,
+        sort=sort,
+        sorts=list(SORTS),
+        filters=filters,
+        states=member_filters.STATES,
+        total=total,
         plans=plans
     )
 
@@ -51,38 +84,32 @@ def list_members():
 def search_members():
     query = request.args.get("q", "").strip()
     today = date.today()
+    filters = member_filters.parse(request.args)
+    where = member_filters.conditions(filters, today, current_app.config.get("GRACE_PERIOD_DAYS", 3))
+    next_cursor = None
     
     if not query:
-        members_query = db.session.query(Member, Plan).outerjoin(Plan).order_by(Member.id.desc()).limit(10)
+        sort = request.args.get("sort", "newest")
+        column, desc = SORTS.get(sort, SORTS["newest"])
+        page = keyset_page(
+            db.session.query(Member, Plan).outerjoin(Plan).filter(*where), column, Member.id, desc=desc,
+            after=request.args.get("after"), per_page=10,
+            key=lambda row: (getattr(row[0], column.key), row[0].id),
+        )
+        members_query, next_cursor = page.items, page.next_cursor
     else:
-        members_query = db.session.query(Member, Plan).outerjoin(Plan).filter(
-            or_(
-                Member.name.ilike(f"%{query}%"),
-                Member.phone.ilike(f"%{query}%"),
-                Member.member_code.ilike(f"%{query}%")
-            )
-        ).order_by(Member.id.desc()).limit(10)
-    
-    members_list = []
-    for member, plan in members_query:
-        days_left = 999
-        if member.expiry_date:
-            days_left = (member.expiry_date - today).days
-        members_list.append({
-            "id": member.id,
-            "code": member.member_code,
-            "name": member.name,
-            "phone": member.phone,
-            "email": member.email,
-            "plan_name": plan.name if plan else "No Plan",
-            "join_date": member.join_date,
-            "expiry_date": member.expiry_date,
-            "status": member.status,
-            "photo_path": member.photo_path,
-            "days_left": days_left
-        })
+        # Ranked ids from the full-text index, then one query for the rows (kept in rank order)
+        ranked_ids, next_cursor = member_search.search_page(
+            query, limit=10, after=request.args.get("after"), where=where
+        )
+        rows = db.session.query(Member, Plan).outerjoin(Plan).filter(Member.id.in_(ranked_ids)).all()
+        rank = {member_id: i for i, member_id in enumerate(ranked_ids)}
+        members_query = sorted(rows, key=lambda row: rank[row[0].id])
     
-    return render_template("member_rows.html", members=members_list)
+    response = Response(render_template("member_rows.html", members=_member_rows(members_query, today)))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 @members.route("/new", methods=["GET", "POST"])
 @login_required
@@ -107,15 +134,13 @@ def new_member():
             return redirect(url_for("members.new_member"))
 
         photo_filename = None
-        if "photo" in request.files:
-            file = request.files["photo"]
-            if file and allowed_file(file.filename):
-                import secrets
-                token = secrets.token_hex(8)
-                photo_filename = f"member_{token}.jpg"
-                upload_path = os.path.join(current_app.static_folder, "uploads", "members")
-                os.makedirs(upload_path, exist_ok=True)
-                file.save(os.path.join(upload_path, photo_filename))
+        if "photo" in request.files and request.files["photo"].filename:
+            try:
+                # Validates the image and writes the original plus thumb/kiosk/card renditions
+                photo_filename = save_member_photo(request.files["photo"])
+            except ValueError as e:
+                flash(f"Photo rejected: {e}", "error")
+                return redirect(url_for("members.new_member"))
 
         plan = Plan.query.get(plan_id)
         if not plan:
@@ -168,6 +193,82 @@ def new_member():
     return render_template("new_member.html", plans=plans, now=datetime.now)
 
 
+@members.route("/import", methods=["GET", "POST"])
+@login_required
+def import_members():
+    summary = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Choose a CSV or XLSX file to import.", "error")
+            return redirect(url_for("members.import_members"))
+        if not upload.filename.lower().endswith((".csv", ".xlsx")):
+            flash("Only .csv and .xlsx files can be imported.", "error")
+            return redirect(url_for("members.import_members"))
+        try:
+            summary = member_import.import_members(
+                upload.stream, upload.filename,
+                default_plan=request.form.get("plan_id") or None,
+                dry_run=bool(request.form.get("dry_run")),
+            )
+        except ValueError as e:
+            flash(f"Could not read the file: {e}", "error")
+            return redirect(url_for("members.import_members"))
+        if not summary["dry_run"] and summary["imported"]:
+            flash(f"Imported {summary['imported']} members.", "success")
+
+    plans = Plan.query.filter_by(is_active=True).all()
+    return render_template("import_members.html", active_page="members", plans=plans, summary=summary)
+
+
+@members.route("/bulk", methods=["POST"])
+@login_required
+def bulk_action():
+    action = request.form.get("action")
+    today = date.today()
+
+    # Selection: ticked rows, or everything matching the list filters the form carries
+    if request.form.get("scope") == "filter":
+        filters = member_filters.parse(request.form)
+        if not filters:
+            flash("Choose at least one filter before applying an action to all matching members.", "error")
+            return redirect(url_for("members.list_members"))
+        ids = member_bulk.select_ids(where=member_filters.conditions(
+            filters, today, current_app.config.get("GRACE_PERIOD_DAYS", 3)
+        ))
+    else:
+        ids = member_bulk.select_ids(request.form.getlist("member_ids", type=int))
+    if not ids:
+        flash("No members selected.", "error")
+        return redirect(url_for("members.list_members"))
+
+    try:
+        if action == "renew":
+            plan = Plan.query.get(request.form.get("plan_id", type=int) or 0)
+            if not plan:
+                flash("Selected plan does not exist.", "error")
+                return redirect(url_for("members.list_members"))
+            try:
+                start = datetime.strptime(request.form.get("start_date", ""), "%Y-%m-%d").date()
+            except ValueError:
+                start = today
+            summary = member_bulk.renew(
+                ids, plan, start,
+                payment_method=request.form.get("payment_method", "Cash"),
+                mode=request.form.get("mode", "restart"),
+            )
+        elif action in ("activate", "deactivate"):
+            summary = member_bulk.set_status(ids, "Active" if action == "activate" else "Inactive")
+        else:
+            flash("Unknown bulk action.", "error")
+            return redirect(url_for("members.list_members"))
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for("members.list_members"))
+
+    return render_template("bulk_result.html", active_page="members", summary=summary)
+
+
 @members.route("/<int:id>")
 @login_required
 def view_member(id):
@@ -1,10 +1,55 @@
-from flask import render_template, request, jsonify
+import json
+from flask import render_template, request, jsonify, Response, stream_with_context, abort, flash
 from flask_login import login_required
 from datetime import date, datetime, timedelta
 from sqlalchemy import func, and_
 from dateutil.relativedelta import relativedelta
 from . import reports
-from src.models import db, Member, Plan, Transaction, Attendance
+from src.models import db, Member, Plan, Attendance
+from src.utils import timeseries, rollups
+from src.utils.cohorts import cohort_cache, METRICS as COHORT_METRICS
+from src.utils.exports import DATASETS as EXPORT_DATASETS, export_rows, iter_csv
+from src.utils.series_cache import series_cache
+from src.utils import report_jobs
+from src.utils.jobs import job_runner, serialize as serialize_job
+
+MAX_CUSTOM_RANGE_DAYS = 366 * 10
+# Longer custom ranges are handed to the report job runner instead of a request thread
+MAX_SYNC_RANGE_DAYS = 366 * 2
+
+
+def _custom_range(args, today):
+    """
+    Series for ?start=&end=&granularity=&compare=1. Ranges up to
+    MAX_SYNC_RANGE_DAYS are built in the request; longer ones run on the
+    report job runner and the page polls for them (custom['job']).
+    """
+    start = datetime.strptime(args.get('start') or today.replace(day=1).isoformat(), '%Y-%m-%d').date()
+    end = min(datetime.strptime(args.get('end') or today.isoformat(), '%Y-%m-%d').date(), today)
+    if end < start or (end - start).days > MAX_CUSTOM_RANGE_DAYS:
+        raise ValueError("Invalid date range")
+    span = (end - start).days + 1
+
+    granularity = args.get('granularity')
+    if granularity not in timeseries.GRANULARITIES:
+        granularity = 'day' if span <= 62 else 'week' if span <= 366 else 'month'
+    if granularity == 'day' and span > 400:
+        granularity = 'week'
+    compare = args.get('compare') == '1'
+
+    custom = {'start': start, 'end': end, 'granularity': granularity, 'compare': compare}
+    if span <= MAX_SYNC_RANGE_DAYS:
+        custom.update(report_jobs.custom_range(start, end, granularity, compare))
+        return custom
+    job = job_runner.submit('custom_range', {
+        'start': start.isoformat(), 'end': end.isoformat(), 'granularity': granularity, 'compare': compare,
+    })
+    if job.status == 'done':
+        custom.update(json.loads(job.result))
+    else:
+        custom['job'] = serialize_job(job)
+    return custom
+
 
 @reports.route('/')
 @login_required
@@ -15,10 +60,8 @@ def analytics():
     # --- 1. KPI CARDS DATA (Static) ---
     new_members_count = Member.query.filter(Member.join_date >= current_month_start).count()
     
-    renewals_count = Transaction.query.filter(
-        Transaction.date >= current_month_start,
-        Transaction.transaction_type == 'Renewal'
-    ).count()
+    month_end = (current_month_start + relativedelta(months=1)) - timedelta(days=1)
+    renewals_count = rollups.revenue_total(current_month_start, month_end, 'Renewal', measure='tx_count')
     
     thirty_days_ago = today - timedelta(days=30)
     dropouts_count = Member.query.filter(
@@ -32,7 +75,7 @@ def analytics():
     ).count()
     
     unique_attendees = db.session.query(func.count(func.distinct(Attendance.member_id))).filter(
-        Attendance.timestamp >= current_month_start
+        Attendance.date >= current_month_start
     ).scalar() or 0
     
     avg_attendance = 0
@@ -40,41 +83,20 @@ def analytics():
         avg_attendance = round((unique_attendees / total_active_valid) * 100)
 
     # --- 2. CHART DATA: 1 MONTH (DAILY TREND) ---
-    # FIXED: Now uses a time range (Start of Day to End of Day) so it catches all times.
-    daily_trends = []
-    for i in range(29, -1, -1):
-        day_cursor = today - timedelta(days=i)
-        
-        # Create strict timestamps for the entire day
-        day_start = datetime.combine(day_cursor, datetime.min.time()) # 00:00:00
-        day_end = datetime.combine(day_cursor, datetime.max.time())   # 23:59:59
-        
-        day_revenue = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.date >= day_start,
-            Transaction.date <= day_end
-        ).scalar() or 0
-        
-        daily_trends.append({
-            'label': day_cursor.strftime('%d %b'), 
-            'revenue': day_revenue
-        })
-
-    # --- 3. CHART DATA: 12 MONTHS (MONTHLY TREND) ---
-    monthly_trends = []
-    for i in range(11, -1, -1):
-        date_cursor = today - relativedelta(months=i)
-        start_date = date_cursor.replace(day=1)
-        end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
-        
-        month_revenue = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).scalar() or 0
-        
-        monthly_trends.append({
-            'label': start_date.strftime('%b %Y'), 
-            'revenue': month_revenue
-        })
+    # Read from the pre-aggregated revenue rollups (gaps zero-filled in Python)
+    daily_trends = [
+        {'label': timeseries.label(day, 'day'), 'revenue': value}
+        for day, value in series_cache.get('revenue', today - timedelta(days=29), today, 'day')
+    ]
+
+    # --- 3. CHART DATA: 12 MONTHS (MONTHLY TREND, WITH YEAR-OVER-YEAR) ---
+    # 24 monthly rollup rows cover both this year and the same months last year
+    year_start = (today - relativedelta(months=11)).replace(day=1)
+    months = series_cache.get('revenue', year_start - relativedelta(years=1), month_end, 'month')
+    monthly_trends = [
+        {'label': timeseries.label(month, 'month'), 'revenue': value, 'last_year': previous}
+        for (month, value), (_, previous) in zip(months[12:], months[:12])
+    ]
 
     # --- 4. CHART DATA: PLAN DISTRIBUTION ---
     plan_dist_query = db.session.query(Plan.name, func.count(Member.id))\
@@ -87,6 +109,14 @@ def analytics():
         
     plan_distribution = [{'name': p[0], 'count': p[1]} for p in plan_dist_query]
 
+    # --- 5. CUSTOM RANGE / COMPARE MODE ---
+    custom = None
+    if request.args.get('start') or request.args.get('end'):
+        try:
+            custom = _custom_range(request.args, today)
+        except ValueError:
+            flash('Invalid report range. Use a start date on or before the end date (max 10 years).', 'warning')
+
     return render_template('reports.html',
         active_page='reports',
         new_members_count=new_members_count,
@@ -95,5 +125,62 @@ def analytics():
         avg_attendance=avg_attendance,
         daily_trends=daily_trends,     
         monthly_trends=monthly_trends, 
-        plan_distribution=plan_distribution
-    )
\ No newline at end of file
+        plan_distribution=plan_distribution,
+        custom=custom,
+        granularities=timeseries.GRANULARITIES,
+        year_start=today.replace(month=1, day=1).isoformat()
+    )
+
+
+@reports.route('/retention')
+@login_required
+def retention():
+    """Cohort retention: members grouped by join month, tracked month by month."""
+    metric = request.args.get('metric', 'active')
+    if metric not in COHORT_METRICS:
+        metric = 'active'
+    months = min(max(request.args.get('months', 12, type=int), 1), 36)
+
+    cohorts = cohort_cache.retention(months)
+    if request.args.get('format') == 'json':
+        return jsonify([
+            {**row, 'cohort': row['cohort'].strftime('%Y-%m')} for row in cohorts
+        ])
+
+    return render_template('retention.html',
+        active_page='reports',
+        cohorts=cohorts,
+        metric=metric,
+        months=months,
+        metrics=COHORT_METRICS,
+        offsets=range(months)
+    )
+
+
+@reports.route('/export/<dataset>')
+@login_required
+def export_csv(dataset):
+    """
+    Streamed CSV download: /reports/export/attendance?start=2025-01-01&end=2025-12-31&gzip=1
+    Rows are fetched in batches and written as they arrive, so memory stays flat.
+    """
+    if dataset not in EXPORT_DATASETS:
+        abort(404)
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+    compress = request.args.get('gzip') == '1'
+
+    header, rows = export_rows(dataset, start, end)
+    span = f"_{start or 'all'}_{end or date.today()}" if start or end else ''
+    filename = f"ironlifter_{dataset}{span}.csv" + ('.gz' if compress else '')
+
+    response = Response(
+        stream_with_context(iter_csv(header, rows, compress)),
+        mimetype='application/gzip' if compress else 'text/csv',
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
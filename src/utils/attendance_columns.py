@@ -0,0 +1,217 @@
+import calendar
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from src.models import db, Attendance
+
+try:  # Optional: vectorised path when NumPy is installed
+    import numpy as np
+except ImportError:
+    np = None
+
+LOAD_BATCH = 10000
+APPEND_EVERY_SECONDS = 30
+FULL_RELOAD_SECONDS = 6 * 3600  # also picks up deleted rows
+# Ids are assigned at INSERT but rows only become visible at COMMIT, so a
+# lower id can appear after a higher one was loaded: appends re-read this
+# many ids below the last one and skip the ones already loaded.
+RESCAN_IDS = 1000
+
+
+def to_epoch(ts):
+    """Naive local timestamp -> int seconds, treating local time as UTC so hours/days stay local."""
+    return calendar.timegm(ts.timetuple())
+
+
+class AttendanceColumns:
+    """
+    Attendance as two parallel int columns sorted by time:
+    `_ts` (int64 epoch seconds) and `_member` (int32 member id), about 12
+    bytes a row, so 5M check-ins are ~60 MB instead of millions of ORM objects.
+
+    New rows are appended by primary key (plus a RESCAN_IDS trailing window
+    for late commits) at most every APPEND_EVERY_SECONDS; a time window is
+    two bisects, and aggregates run over the slice with NumPy when
+    available, plain loops otherwise. Loading and sorting happen outside
+    `_lock` (one refresher at a time, via `_refresh_lock`); readers only
+    wait for the swap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ts = array('q')
+        self._member = array('i')
+        self._last_id = 0
+        self._tail = set()  # loaded ids within RESCAN_IDS of _last_id
+        self._loaded_at = None
+        self._appended_at = 0.0
+        self._generation = 0  # bumped by clear(); a refresh started before it is discarded
+
+    # --- LOADING ---
+    def _fetch(self, after_id, skip=frozenset()):
+        """
+        Stream rows with id > after_id (except ids in `skip`) straight into new
+        columns (no per-row objects kept). Returns (last id, ts, member, ids of
+        the final RESCAN_IDS rows).
+        """
+        rows = db.session.query(Attendance.id, Attendance.member_id, Attendance.timestamp).filter(
+            Attendance.id > after_id,
+            Attendance.member_id != None,
+            Attendance.timestamp != None,
+        ).order_by(Attendance.id).execution_options(yield_per=LOAD_BATCH)
+        ts_col, member_col, last_id = array('q'), array('i'), after_id
+        recent = deque(maxlen=RESCAN_IDS)
+        for row_id, member_id, ts in rows:
+            recent.append(row_id)
+            last_id = row_id
+            if row_id in skip:
+                continue
+            ts_col.append(to_epoch(ts))
+            member_col.append(member_id)
+        return last_id, ts_col, member_col, recent
+
+    @staticmethod
+    def _sorted(ts_col, member_col):
+        """Columns reordered by time. Id order is almost time order; offline kiosk syncs arrive late."""
+        if all(ts_col[i] <= ts_col[i + 1] for i in range(len(ts_col) - 1)):
+            return ts_col, member_col
+        if np is not None:
+            order = np.argsort(np.frombuffer(ts_col, dtype=np.int64), kind='stable')
+            return (array('q', np.frombuffer(ts_col, dtype=np.int64)[order].tobytes()),
+                    array('i', np.frombuffer(member_col, dtype=np.int32)[order].tobytes()))
+        order = sorted(range(len(ts_col)), key=ts_col.__getitem__)
+        return array('q', (ts_col[i] for i in order)), array('i', (member_col[i] for i in order))
+
+    def _reload(self, generation):
+        last_id, ts_col, member_col, recent = self._fetch(0)
+        ts_col, member_col = self._sorted(ts_col, member_col)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._ts, self._member = ts_col, member_col
+            self._last_id = last_id
+            self._tail = {i for i in recent if i > last_id - RESCAN_IDS}
+            self._loaded_at = self._appended_at = time.monotonic()
+
+    def _append(self, generation):
+        floor = max(self._last_id - RESCAN_IDS, 0)
+        last_id, ts_col, member_col, recent = self._fetch(floor, skip=self._tail)
+        last_id = max(last_id, self._last_id)
+        tail = {i for i in self._tail.union(recent) if i > last_id - RESCAN_IDS}
+        merged = None
+        if ts_col and self._ts and min(ts_col) < self._ts[-1]:
+            # Rare (backdated or late-committed rows): re-sort a copy instead of merging in place
+            merged = self._sorted(self._ts + ts_col, self._member + member_col)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if merged:
+                self._ts, self._member = merged
+            else:
+                self._ts.extend(ts_col)
+                self._member.extend(member_col)
+            self._last_id, self._tail = last_id, tail
+            self._appended_at = time.monotonic()
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            loaded = self._loaded_at is not None
+            reload = force or not loaded or now - self._loaded_at > FULL_RELOAD_SECONDS
+            if not reload and now - self._appended_at <= APPEND_EVERY_SECONDS:
+                return
+        # Another thread is already refreshing: serve the current columns
+        # (only the very first load, or a forced one, is worth waiting for)
+        if not self._refresh_lock.acquire(blocking=force or not loaded):
+            return
+        try:
+            with self._lock:
+                generation = self._generation
+                now = time.monotonic()
+                reload = force or self._loaded_at is None or now - self._loaded_at > FULL_RELOAD_SECONDS
+                if not reload and now - self._appended_at <= APPEND_EVERY_SECONDS:
+                    return
+            if reload:
+                self._reload(generation)
+            else:
+                self._append(generation)
+        finally:
+            self._refresh_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._ts, self._member = array('q'), array('i')
+            self._last_id, self._tail, self._loaded_at = 0, set(), None
+
+    # --- QUERIES ---
+    def _window(self, start, end):
+        """Index range [lo, hi) of rows with start <= timestamp < end (datetimes)."""
+        lo = bisect_left(self._ts, to_epoch(start)) if start else 0
+        hi = bisect_left(self._ts, to_epoch(end)) if end else len(self._ts)
+        return lo, hi
+
+    def hourly_counts(self, start=None, end=None):
+        """Check-ins per hour of day (24 ints) in [start, end)."""
+        self.refresh()
+        with self._lock:
+            lo, hi = self._window(start, end)
+            if np is not None:
+                ts = np.frombuffer(self._ts, dtype=np.int64)[lo:hi]
+                return np.bincount((ts // 3600) % 24, minlength=24).tolist()
+            counts = [0] * 24
+            for t in self._ts[lo:hi]:
+                counts[(t // 3600) % 24] += 1
+            return counts
+
+    def visits_per_member(self, start=None, end=None):
+        """{member_id: visits} in [start, end)."""
+        self.refresh()
+        with self._lock:
+            lo, hi = self._window(start, end)
+            if np is not None:
+                ids, counts = np.unique(np.frombuffer(self._member, dtype=np.int32)[lo:hi], return_counts=True)
+                return dict(zip(ids.tolist(), counts.tolist()))
+            return dict(Counter(self._member[lo:hi]))
+
+    def distinct_attendees(self, start=None, end=None):
+        self.refresh()
+        with self._lock:
+            lo, hi = self._window(start, end)
+            if np is not None:
+                return int(np.unique(np.frombuffer(self._member, dtype=np.int32)[lo:hi]).size)
+            return len(set(self._member[lo:hi]))
+
+    def frequency_histogram(self, start=None, end=None):
+        """{visits: number of members with that many visits} in [start, end)."""
+        return dict(sorted(Counter(self.visits_per_member(start, end).values()).items()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': len(self._ts),
+                'bytes': self._ts.itemsize * len(self._ts) + self._member.itemsize * len(self._member),
+                'last_id': self._last_id,
+                'vectorized': np is not None,
+            }
+
+
+attendance_columns = AttendanceColumns()
+
+
+def summary(start, end):
+    """Window summary for the API: hourly counts, distinct attendees and visit frequency."""
+    end_exclusive = end + timedelta(days=1)
+    start_dt, end_dt = datetime.combine(start, datetime.min.time()), datetime.combine(end_exclusive, datetime.min.time())
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'hourly': attendance_columns.hourly_counts(start_dt, end_dt),
+        'distinct_attendees': attendance_columns.distinct_attendees(start_dt, end_dt),
+        'visit_frequency': attendance_columns.frequency_histogram(start_dt, end_dt),
+        'cache': attendance_columns.stats(),
+    }
@@ -56,6 +56,7 @@ def create_backup(db):
             'plan_id': member.plan_id,
             'plan_price_at_join': member.plan_price_at_join,
             'join_date': str(member.join_date) if member.join_date else None,
+            'first_join_date': str(member.first_join_date) if member.first_join_date else None,
             'expiry_date': str(member.expiry_date) if member.expiry_date else None,
             'status': member.status,
             'emergency_contact_name': member.emergency_contact_name,
@@ -273,6 +274,7 @@ def restore_backup(db, filepath_string):
                 plan_id=m_data['plan_id'],
                 plan_price_at_join=m_data['plan_price_at_join'],
                 join_date=datetime.strptime(m_data['join_date'], '%Y-%m-%d').date() if m_data.get('join_date') else None,
+                first_join_date=datetime.strptime(m_data.get('first_join_date') or m_data['join_date'], '%Y-%m-%d').date() if m_data.get('first_join_date') or m_data.get('join_date') else None,
                 expiry_date=datetime.strptime(m_data['expiry_date'], '%Y-%m-%d').date() if m_data.get('expiry_date') else None,
                 status=m_data['status'],
                 emergency_contact_name=m_data['emergency_contact_name'],
@@ -340,6 +342,24 @@ def restore_backup(db, filepath_string):
         
         # STEP 3: COMMIT THE CHANGES
         db.session.commit()
+
+        # The bulk deletes above bypass model events: resync rollups and in-memory caches
+        from src.utils.daily_stats import rebuild as rebuild_daily_stats
+        from src.utils.member_index import member_index
+        from src.utils.rollups import backfill as backfill_report_rollups
+        from src.utils.cohorts import cohort_cache
+        from src.utils.peak_hours import peak_hours
+        from src.utils.series_cache import series_cache
+        from src.utils.attendance_columns import attendance_columns
+        from src.utils.typeahead import member_typeahead
+        rebuild_daily_stats()
+        backfill_report_rollups()
+        member_index.clear()
+        cohort_cache.clear()
+        peak_hours.clear()
+        series_cache.clear()
+        attendance_columns.clear()
+        member_typeahead.build()
         
         # Optional: Reset sequence counters for auto-incrementing IDs
         # This prevents ID conflicts when inserting new records manually later.
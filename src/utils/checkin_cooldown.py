@@ -0,0 +1,119 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+from src.models import db, Attendance
+
+COOLDOWN = timedelta(hours=1)
+
+
+class CheckinCooldown:
+    """
+    In-process "last check-in" cache keyed by member_id, used for the
+    one-hour double-tap guard instead of an Attendance range query.
+
+    Entries older than the TTL are evicted lazily and by a periodic sweep.
+    All access goes through one lock, so the waitress worker threads in
+    main.py see a single consistent view. (One cache per process: a
+    multi-process server would need a shared store instead.)
+    """
+
+    def __init__(self, ttl=COOLDOWN):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last = {}
+        self._last_sweep = datetime.now()
+        self._warmed = False
+
+    def warm(self):
+        """Seed the cache from the last TTL window of Attendance."""
+        since = datetime.now() - self.ttl
+        rows = db.session.query(Attendance.member_id, func.max(Attendance.timestamp)).filter(
+            Attendance.member_id != None,
+            Attendance.timestamp >= since
+        ).group_by(Attendance.member_id).all()
+        with self._lock:
+            for member_id, ts in rows:
+                if isinstance(ts, datetime):
+                    self._store(member_id, ts)
+            self._warmed = True
+
+    def _store(self, member_id, ts):
+        current = self._last.get(member_id)
+        if current is None or ts > current:
+            self._last[member_id] = ts
+
+    def _sweep(self, now):
+        if now - self._last_sweep < self.ttl:
+            return
+        cutoff = now - self.ttl
+        for member_id in [m for m, ts in self._last.items() if ts < cutoff]:
+            del self._last[member_id]
+        self._last_sweep = now
+
+    def _recent(self, member_id, now):
+        ts = self._last.get(member_id)
+        if ts is not None and abs(now - ts) < self.ttl:
+            return ts
+        return None
+
+    def last_checkin(self, member_id, now=None):
+        """Returns the check-in time inside the cooldown window, or None."""
+        if not self._warmed:
+            self.warm()
+        now = now or datetime.now()
+        with self._lock:
+            return self._recent(member_id, now)
+
+    def claim(self, member_id, now=None):
+        """
+        Atomic check-and-set for a new tap. Returns the blocking timestamp if
+        the member is still cooling down, otherwise records `now` and returns None.
+        """
+        if not self._warmed:
+            self.warm()
+        now = now or datetime.now()
+        with self._lock:
+            self._sweep(now)
+            recent = self._recent(member_id, now)
+            if recent:
+                return recent
+            self._last[member_id] = now
+            return None
+
+    def release(self, member_id, ts):
+        """Undo a claim whose insert failed."""
+        with self._lock:
+            if self._last.get(member_id) == ts:
+                del self._last[member_id]
+
+    def record(self, member_id, ts):
+        """Register a committed check-in."""
+        if member_id is None or not isinstance(ts, datetime):
+            return
+        with self._lock:
+            self._store(member_id, ts)
+
+
+checkin_cooldown = CheckinCooldown()
+
+
+# --- MODEL EVENTS ---
+# ORM inserts are staged on the session and only applied once committed, so
+# a rolled-back check-in never blocks the member for an hour.
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('cooldown_pending', []).append((target.member_id, target.timestamp))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for member_id, ts in session.info.pop('cooldown_pending', []):
+        checkin_cooldown.record(member_id, ts)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('cooldown_pending', None)
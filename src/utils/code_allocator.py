@@ -0,0 +1,139 @@
+import hashlib
+import secrets
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+from src.models import db, Member, CodeSequence, MEMBER_CODE_LENGTH
+
+SEQUENCE = 'member_code'
+DEFAULT_DIGITS = 5
+LOW_SPACE_RATIO = 0.9  # warn once a width is this full
+ROUNDS = 4
+RESERVE_CHUNK = 500  # indexes claimed per step (bounds the IN list)
+
+
+# --- KEYED PERMUTATION ---
+def _feistel(x, half_bits, key):
+    mask = (1 << half_bits) - 1
+    left, right = x >> half_bits, x & mask
+    for round_no in range(ROUNDS):
+        digest = hashlib.blake2b(f"{round_no}:{right}".encode(), key=key, digest_size=8).digest()
+        left, right = right, left ^ (int.from_bytes(digest, 'big') & mask)
+    return (left << half_bits) | right
+
+
+def permute(index, size, key):
+    """
+    Bijection on [0, size): a Feistel network over the smallest even bit width
+    that covers `size`, cycle-walking values that land outside the range.
+    Consecutive indexes map to codes that look random but never repeat.
+    """
+    half_bits = ((size - 1).bit_length() + 1) // 2
+    x = _feistel(index, half_bits, key)
+    while x >= size:
+        x = _feistel(x, half_bits, key)
+    return x
+
+
+def space(digits):
+    """(first code, number of codes) for `digits`-wide codes: 5 -> (10000, 90000)."""
+    low = 10 ** (digits - 1)
+    return low, 9 * low
+
+
+def code_at(index, digits, key):
+    low, size = space(digits)
+    return str(low + permute(index, size, bytes.fromhex(key)))
+
+
+# --- SEQUENCE STATE ---
+def _sequence():
+    row = db.session.get(CodeSequence, SEQUENCE, populate_existing=True)
+    if row is not None:
+        return row
+    digits = current_app.config.get('MEMBER_CODE_DIGITS', DEFAULT_DIGITS)
+    try:
+        with db.session.begin_nested():
+            db.session.add(CodeSequence(name=SEQUENCE, digits=digits, next_index=0, key=secrets.token_hex(16)))
+    except IntegrityError:
+        pass  # another worker created it first
+    return db.session.get(CodeSequence, SEQUENCE, populate_existing=True)
+
+
+def _advance(digits, start, new_digits, new_index):
+    """Compare-and-swap the sequence position; False if another allocation moved it first."""
+    moved = db.session.query(CodeSequence).filter(
+        CodeSequence.name == SEQUENCE,
+        CodeSequence.digits == digits,
+        CodeSequence.next_index == start,
+    ).update({CodeSequence.digits: new_digits, CodeSequence.next_index: new_index}, synchronize_session=False)
+    return moved == 1
+
+
+def _reserve(count):
+    """Claim up to `count` consecutive sequence indexes: (digits, start, taken, key)."""
+    min_digits = current_app.config.get('MEMBER_CODE_DIGITS', DEFAULT_DIGITS)
+    while True:
+        row = _sequence()
+        digits, start, key = row.digits, row.next_index, row.key
+        _, size = space(digits)
+
+        if digits < min_digits or start >= size:
+            # Width configured wider, or this width is used up: continue in the next one
+            new_digits = max(digits + 1, min_digits)
+            if new_digits > MEMBER_CODE_LENGTH:
+                raise ValueError("Member code space exhausted")
+            if _advance(digits, start, new_digits, 0):
+                print(f"INFO: Member codes now allocated with {new_digits} digits.")
+            continue
+
+        taken = min(count, size - start)
+        if _advance(digits, start, digits, start + taken):
+            if start < size * LOW_SPACE_RATIO <= start + taken:
+                print(f"WARNING: {digits}-digit member codes are {int(LOW_SPACE_RATIO * 100)}% used; "
+                      f"new members will get {digits + 1}-digit codes when they run out.")
+            return digits, start, taken, key
+
+
+def allocate_codes(count):
+    """
+    `count` unused member codes, reserved in the caller's transaction.
+
+    Codes are successive positions of a keyed permutation of the code space,
+    so the counter row is the only shared state: each reservation is a
+    compare-and-swap UPDATE of it (row lock on PostgreSQL, writer lock on
+    SQLite), and concurrent callers can never receive the same index. Codes
+    from before the allocator existed are skipped with one IN query per
+    reservation. If the caller rolls back, the indexes are handed out again.
+    """
+    codes = []
+    while len(codes) < count:
+        digits, start, taken, key = _reserve(min(count - len(codes), RESERVE_CHUNK))
+        candidates = [code_at(i, digits, key) for i in range(start, start + taken)]
+        in_use = {code for (code,) in db.session.query(Member.member_code).filter(Member.member_code.in_(candidates))}
+        codes.extend(code for code in candidates if code not in in_use)
+    return codes
+
+
+def usage():
+    row = _sequence()
+    _, size = space(row.digits)
+    return {'digits': row.digits, 'allocated': row.next_index, 'capacity': size}
+
+
+@click.command('member-codes')
+@click.option('--widen', is_flag=True, help='Allocate new codes with one more digit from now on.')
+@with_appcontext
+def member_codes_command(widen):
+    """Show member code usage; --widen switches new codes to a wider format."""
+    if widen:
+        row = _sequence()
+        if row.digits + 1 > MEMBER_CODE_LENGTH:
+            raise click.ClickException("Codes are already at the widest format.")
+        if not _advance(row.digits, row.next_index, row.digits + 1, 0):
+            raise click.ClickException("Codes were allocated concurrently; try again.")
+        db.session.commit()
+    stats = usage()
+    click.echo(f"{stats['digits']}-digit codes: {stats['allocated']} of {stats['capacity']} allocated "
+               f"({stats['allocated'] * 100 // stats['capacity']}%).")
@@ -0,0 +1,180 @@
+import threading
+import time
+from array import array
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+from src.models import db, Member, Attendance, Transaction
+from src.utils.timeseries import bucket_expr
+
+METRICS = ('active', 'attending', 'renewed')
+
+
+def month_start(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def months_between(start, end):
+    """Whole calendar months from start's month to end's month (Jan -> Mar = 2)."""
+    return (end.year - start.year) * 12 + (end.month - start.month)
+
+
+def _compute(cohorts, today):
+    """
+    Build retention rows for the given cohort months in one pass per table:
+    members once, then grouped renewal and (member, month) attendance rows.
+    Per-cohort counters are flat int arrays indexed by month offset;
+    'active' and 'renewed' are filled as difference arrays and prefix-summed.
+    """
+    first, last = min(cohorts), max(cohorts)
+    joined_before = last + relativedelta(months=1)
+    slot = {c: i for i, c in enumerate(cohorts)}
+    width = [months_between(c, today) + 1 for c in cohorts]
+    size = [0] * len(cohorts)
+    counts = {m: [array('l', [0]) * (w + 1) for w in width] for m in METRICS}
+    member_slot = {}
+
+    in_cohorts = (Member.first_join_date >= first, Member.first_join_date < joined_before)
+
+    # 1. Members: cohort size and how far each membership reaches
+    rows = db.session.query(Member.id, Member.first_join_date, Member.expiry_date)\
+        .filter(*in_cohorts).execution_options(yield_per=2000)
+    for member_id, join_date, expiry_date in rows:
+        i = slot.get(month_start(join_date))
+        if i is None:  # a cohort in the range that is still cached
+            continue
+        member_slot[member_id] = i
+        size[i] += 1
+        if expiry_date and expiry_date >= join_date:
+            reach = min(months_between(cohorts[i], expiry_date), width[i] - 1)
+            counts['active'][i][0] += 1
+            counts['active'][i][reach + 1] -= 1
+
+    # 2. Renewals: first renewal month per member (one grouped query)
+    rows = db.session.query(Transaction.member_id, func.min(Transaction.date))\
+        .join(Member, Member.id == Transaction.member_id)\
+        .filter(Transaction.transaction_type == 'Renewal', *in_cohorts)\
+        .group_by(Transaction.member_id)
+    for member_id, first_renewal in rows:
+        i = member_slot.get(member_id)
+        if i is None or first_renewal is None:
+            continue
+        offset = months_between(cohorts[i], month_start(first_renewal))
+        if 0 <= offset < width[i]:
+            counts['renewed'][i][offset] += 1
+
+    # 3. Attendance: distinct (member, month) pairs, streamed
+    month = bucket_expr(Attendance.date, 'month')
+    rows = db.session.query(Attendance.member_id, month)\
+        .join(Member, Member.id == Attendance.member_id)\
+        .filter(Attendance.date >= first, *in_cohorts)\
+        .group_by(Attendance.member_id, month).execution_options(yield_per=5000)
+    for member_id, bucket in rows:
+        i = member_slot.get(member_id)
+        if i is None:
+            continue
+        offset = months_between(cohorts[i], month_start(bucket))
+        if 0 <= offset < width[i]:
+            counts['attending'][i][offset] += 1
+
+    result = {}
+    for cohort, i in slot.items():
+        row = {'cohort': cohort, 'size': size[i]}
+        for metric in METRICS:
+            values = counts[metric][i][:width[i]]
+            if metric != 'attending':
+                running = 0
+                for n, delta in enumerate(values):
+                    running += delta
+                    values[n] = running
+            row[metric] = [round(v * 100 / size[i], 1) if size[i] else 0 for v in values]
+        result[cohort] = row
+    return result
+
+
+class CohortCache:
+    """
+    Retention rows cached per cohort month. Stale or missing cohorts are
+    recomputed together in a single pass; member edits drop their cohort
+    immediately, attendance/renewals are picked up when the entry expires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._generation = 0  # bumped by invalidations; results computed across one aren't kept
+
+    def retention(self, months=12, today=None):
+        today = today or date.today()
+        ttl = current_app.config.get('COHORT_CACHE_SECONDS', 900)
+        newest = today.replace(day=1)
+        cohorts = [newest - relativedelta(months=n) for n in range(months - 1, -1, -1)]
+
+        now = time.monotonic()
+        with self._lock:
+            missing = [c for c in cohorts if c not in self._rows or now - self._rows[c][0] > ttl]
+        fresh = {}
+        if missing:
+            generation = self._generation
+            fresh = _compute(missing, today)
+            with self._lock:
+                if generation == self._generation:
+                    for cohort, row in fresh.items():
+                        self._rows[cohort] = (now, row)
+        with self._lock:
+            rows = {c: entry[1] for c, entry in self._rows.items()}
+        rows.update(fresh)
+        return [rows[c] for c in cohorts if c in rows]
+
+    def discard(self, cohort):
+        with self._lock:
+            self._generation += 1
+            self._rows.pop(cohort, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._rows.clear()
+
+
+cohort_cache = CohortCache()
+
+
+# --- INVALIDATION ---
+# Staged at flush and applied on commit, so a retention pass running
+# concurrently can't re-cache the cohort from pre-commit data.
+def _stage(target, value):
+    session = object_session(target)
+    if session is not None and value:
+        session.info.setdefault('cohort_pending', set()).add(month_start(value))
+
+
+@event.listens_for(Member, 'after_insert')
+@event.listens_for(Member, 'after_delete')
+def _member_added_or_removed(mapper, connection, target):
+    _stage(target, target.first_join_date)
+
+
+@event.listens_for(Member, 'after_update')
+def _member_updated(mapper, connection, target):
+    # Renewals leave the cohort alone but move expiry_date, which its 'active' row reads
+    history = inspect(target).attrs.first_join_date.history
+    for value in (target.first_join_date, *history.deleted):
+        _stage(target, value)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for cohort in session.info.pop('cohort_pending', ()):
+        cohort_cache.discard(cohort)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('cohort_pending', None)
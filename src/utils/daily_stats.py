@@ -0,0 +1,147 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case
+from src.models import db, Attendance, Transaction, DailyStats
+from src.utils.rollups import upsert_add
+
+COUNTERS = ('checkins', 'new_members', 'renewals', 'revenue')
+
+
+def _as_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.today()
+
+
+def bump(connection, day, **deltas):
+    """
+    Add `deltas` to the counters of `day` using the caller's connection, so the
+    rollup commits (or rolls back) together with the rows that caused it.
+    """
+    upsert_add(connection, DailyStats.__table__, {'date': day}, deltas)
+
+
+def _transaction_deltas(target, sign):
+    return {
+        'revenue': sign * (target.amount or 0),
+        'new_members': sign if target.transaction_type == 'New Membership' else 0,
+        'renewals': sign if target.transaction_type == 'Renewal' else 0,
+    }
+
+
+# --- MODEL EVENTS ---
+# Only fire for ORM unit-of-work writes; bulk paths call bump() themselves.
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    bump(connection, _as_day(target.date or target.timestamp), checkins=1)
+
+
+@event.listens_for(Attendance, 'after_delete')
+def _attendance_deleted(mapper, connection, target):
+    bump(connection, _as_day(target.date or target.timestamp), checkins=-1)
+
+
+@event.listens_for(Transaction, 'after_insert')
+def _transaction_inserted(mapper, connection, target):
+    bump(connection, _as_day(target.date), **_transaction_deltas(target, 1))
+
+
+@event.listens_for(Transaction, 'after_delete')
+def _transaction_deleted(mapper, connection, target):
+    bump(connection, _as_day(target.date), **_transaction_deltas(target, -1))
+
+
+def record_transactions(connection, rows):
+    """Daily counters for transactions written with Core bulk inserts (insert dicts), one upsert per day."""
+    per_day = {}
+    for row in rows:
+        day = per_day.setdefault(_as_day(row.get('date')), dict.fromkeys(('revenue', 'new_members', 'renewals'), 0))
+        for counter, delta in _transaction_deltas(SimpleNamespace(**row), 1).items():
+            day[counter] += delta
+    for day, deltas in per_day.items():
+        bump(connection, day, **deltas)
+
+
+# --- READ SIDE ---
+def get_day(day):
+    """Counters for one day (zeros if nothing happened)."""
+    row = db.session.get(DailyStats, day)
+    if row:
+        return row
+    return DailyStats(date=day, checkins=0, new_members=0, renewals=0, revenue=0)
+
+
+def revenue_between(start, end=None):
+    query = db.session.query(func.sum(DailyStats.revenue)).filter(DailyStats.date >= start)
+    if end:
+        query = query.filter(DailyStats.date <= end)
+    return query.scalar() or 0
+
+
+# --- REBUILD ---
+def rebuild(since=None):
+    """
+    Recompute daily_stats from Attendance and Transaction history with two
+    grouped queries. `since` limits the rebuild to days on/after that date.
+    Returns the number of day rows written.
+    """
+    table = DailyStats.__table__
+    days = {}
+
+    att_q = db.session.query(Attendance.date, func.count(Attendance.id)).filter(Attendance.date != None)
+    if since:
+        att_q = att_q.filter(Attendance.date >= since)
+    for day, count in att_q.group_by(Attendance.date):
+        days.setdefault(_parse_day(day), dict.fromkeys(COUNTERS, 0))['checkins'] = count
+
+    tx_day = func.date(Transaction.date)
+    tx_q = db.session.query(
+        tx_day,
+        func.sum(Transaction.amount),
+        func.sum(case((Transaction.transaction_type == 'New Membership', 1), else_=0)),
+        func.sum(case((Transaction.transaction_type == 'Renewal', 1), else_=0)),
+    ).filter(Transaction.date != None)
+    if since:
+        tx_q = tx_q.filter(Transaction.date >= since)
+    for day, revenue, new_members, renewals in tx_q.group_by(tx_day):
+        row = days.setdefault(_parse_day(day), dict.fromkeys(COUNTERS, 0))
+        row.update(revenue=revenue or 0, new_members=new_members or 0, renewals=renewals or 0)
+
+    delete = table.delete()
+    if since:
+        delete = delete.where(table.c.date >= since)
+    db.session.execute(delete)
+    if days:
+        db.session.execute(table.insert(), [{'date': d, **counters} for d, counters in days.items()])
+    db.session.commit()
+    return len(days)
+
+
+def _parse_day(value):
+    # SQLite's date() returns text; PostgreSQL returns a date
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    return _as_day(value)
+
+
+def ensure_built():
+    """First start after upgrading: populate the rollup once from history."""
+    if db.session.query(DailyStats.date).first() is None and (
+        db.session.query(Attendance.id).first() or db.session.query(Transaction.id).first()
+    ):
+        written = rebuild()
+        print(f"INFO: Built daily_stats for {written} days of history.")
+
+
+@click.command('rebuild-daily-stats')
+@click.option('--days', type=int, default=None, help='Only rebuild the last N days (default: all history).')
+@with_appcontext
+def rebuild_daily_stats_command(days):
+    """Recompute the daily_stats rollup table from raw history."""
+    since = date.today() - timedelta(days=days) if days else None
+    written = rebuild(since)
+    click.echo(f"Rebuilt daily_stats: {written} day rows.")
@@ -0,0 +1,84 @@
+import json
+import queue
+import threading
+from collections import deque
+
+# --- CONFIGURATION ---
+SUBSCRIBER_QUEUE_SIZE = 100   # Events buffered per open stream before it is dropped
+REPLAY_SIZE = 50              # Recent events kept for Last-Event-ID reconnects
+
+
+class EventBroker:
+    """
+    Minimal in-process pub/sub used for Server-Sent Events.
+
+    publish() never blocks: a subscriber whose queue is full is cut loose
+    (its browser reconnects and replays from the recent-events buffer).
+    """
+
+    def __init__(self, max_subscribers=3):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=REPLAY_SIZE)
+        self._next_id = 1
+
+    def publish(self, event_type, payload):
+        with self._lock:
+            event = (self._next_id, event_type, payload)
+            self._next_id += 1
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+
+        for sub in subscribers:
+            try:
+                sub.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(sub)
+                try:
+                    sub.put_nowait(None)  # tell the stream to close
+                except queue.Full:
+                    pass
+
+    def subscribe(self, last_event_id=None):
+        """Returns a queue of events, or None when the subscriber cap is reached."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            sub = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event[0] > last_event_id:
+                        sub.put_nowait(event)
+            self._subscribers.add(sub)
+            return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event):
+    """Serialize an (id, type, payload) tuple into the text/event-stream wire format."""
+    event_id, event_type, payload = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+checkin_broker = EventBroker()
+
+
+def publish_checkin(member, timestamp, source):
+    """Push a check-in onto the live stream consumed by dashboard / attendance pages."""
+    checkin_broker.publish('checkin', {
+        'member_id': member.id,
+        'name': member.name,
+        'plan_name': member.plan_name or 'N/A',
+        'date': timestamp.strftime('%Y-%m-%d'),
+        'time': timestamp.strftime('%I:%M %p'),
+        'timestamp': timestamp.isoformat(),
+        'source': source,
+    })
@@ -0,0 +1,129 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime, timedelta
+from src.models import db, Member, Plan, Attendance, Transaction, Expense
+
+# Rows fetched per round-trip; with yield_per SQLAlchemy uses a server-side
+# cursor on PostgreSQL, so only one batch is ever held in memory.
+BATCH_SIZE = 1000
+# Flush the CSV buffer to the client roughly every 64 KB
+FLUSH_BYTES = 64 * 1024
+
+
+def _transactions():
+    return (
+        ['id', 'date', 'invoice_number', 'member_code', 'member_name', 'plan',
+         'amount', 'payment_method', 'transaction_type', 'notes'],
+        db.session.query(
+            Transaction.id, Transaction.date, Transaction.invoice_number, Member.member_code, Member.name,
+            Plan.name, Transaction.amount, Transaction.payment_method, Transaction.transaction_type, Transaction.notes,
+        ).outerjoin(Member, Member.id == Transaction.member_id)
+         .outerjoin(Plan, Plan.id == Transaction.plan_id),
+        Transaction.date,
+        (Transaction.date, Transaction.id),
+    )
+
+
+def _attendance():
+    return (
+        ['id', 'date', 'time', 'member_code', 'member_name', 'check_type'],
+        db.session.query(
+            Attendance.id, Attendance.date, Attendance.timestamp, Member.member_code, Member.name, Attendance.check_type,
+        ).outerjoin(Member, Member.id == Attendance.member_id),
+        Attendance.date,
+        (Attendance.timestamp, Attendance.id),
+    )
+
+
+def _members():
+    return (
+        ['id', 'member_code', 'name', 'phone', 'email', 'gender', 'plan',
+         'plan_price_at_join', 'join_date', 'expiry_date', 'status'],
+        db.session.query(
+            Member.id, Member.member_code, Member.name, Member.phone, Member.email, Member.gender, Plan.name,
+            Member.plan_price_at_join, Member.join_date, Member.expiry_date, Member.status,
+        ).outerjoin(Plan, Plan.id == Member.plan_id),
+        Member.join_date,
+        (Member.id,),
+    )
+
+
+def _expenses():
+    return (
+        ['id', 'date', 'category', 'description', 'amount', 'payment_method'],
+        db.session.query(
+            Expense.id, Expense.date, Expense.category, Expense.description, Expense.amount, Expense.payment_method,
+        ),
+        Expense.date,
+        (Expense.date, Expense.id),
+    )
+
+
+DATASETS = {
+    'transactions': _transactions,
+    'attendance': _attendance,
+    'members': _members,
+    'expenses': _expenses,
+}
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and (
+        value[:1] in ('=', '@') or (value[:1] in ('+', '-') and not value[1:].replace(' ', '').isdigit())
+    ):
+        # Keep spreadsheet apps from evaluating member-entered text as a formula
+        # (phone numbers like "+91 98765 43210" are left alone)
+        return "'" + value
+    return value
+
+
+def export_rows(dataset, start=None, end=None):
+    """
+    (header, row iterator) for a dataset, filtered on its date column
+    (join_date for members). Rows are streamed in BATCH_SIZE chunks.
+    """
+    header, query, date_column, order = DATASETS[dataset]()
+    if start:
+        query = query.filter(date_column >= start)
+    if end:
+        query = query.filter(date_column < end + timedelta(days=1))
+    rows = query.order_by(*order).execution_options(yield_per=BATCH_SIZE)
+
+    if dataset == 'attendance':
+        # The timestamp column only contributes the time of day
+        rows = ((*row[:2], row[2].strftime('%H:%M:%S') if row[2] else None, *row[3:]) for row in rows)
+    return header, rows
+
+
+def iter_csv(header, rows, compress=False):
+    """Yield CSV (optionally gzip-framed) in ~FLUSH_BYTES pieces without buffering the whole file."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+        return gzip.compress(data) if gzip else data
+
+    buffer.write('\ufeff')  # BOM so Excel opens UTF-8 names correctly
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_cell(v) for v in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            chunk = drain()
+            if chunk:
+                yield chunk
+    tail = drain()
+    if gzip:
+        tail += gzip.flush()
+    if tail:
+        yield tail
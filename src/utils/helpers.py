@@ -1,5 +1,4 @@
 import os
-import requests
 from datetime import datetime, date
 from functools import wraps
 from flask import current_app, flash, redirect, url_for
@@ -61,6 +60,40 @@ def allowed_file(filename):
     # Check extension
     return '.' in safe_filename and safe_filename.rsplit('.', 1)[1].lower() in allowed
 
+MAX_IMAGE_EDGE = 1200  # longest side kept for uploaded images
+
+
+def to_rgb(img):
+    """EXIF-rotated RGB copy of a PIL image; transparency is flattened onto white (for JPEG)."""
+    from PIL import Image, ImageOps
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    return img.convert('RGB')
+
+
+def open_upload_image(data):
+    """Verify uploaded image bytes and return them as an RGB image; ValueError if they aren't one."""
+    import io
+    from PIL import Image
+    try:
+        Image.open(io.BytesIO(data)).verify()
+        return to_rgb(Image.open(io.BytesIO(data)))
+    except Exception as e:
+        raise ValueError(f"Invalid image file: {str(e)}")
+
+
+def shrink_image(img, max_edge=MAX_IMAGE_EDGE):
+    """Copy of `img` scaled down to fit max_edge x max_edge (never enlarged)."""
+    from PIL import Image
+    img = img.copy()
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    return img
+
+
 def secure_upload_file(file, upload_folder, max_size_mb=5):
     """Securely upload a file with validation"""
     if not file or file.filename == '':
@@ -68,7 +101,6 @@ def secure_upload_file(file, upload_folder, max_size_mb=5):
     
     import os
     import secrets
-    from PIL import Image
     from werkzeug.utils import secure_filename
     
     # Validate file
@@ -95,36 +127,11 @@ def secure_upload_file(file, upload_folder, max_size_mb=5):
     
     file_path = os.path.join(upload_folder, secure_name)
     
-    # For images, validate and optimize
+    # For images, validate, normalise to RGB and cap at MAX_IMAGE_EDGE
     if ext.lower() in ['.png', '.jpg', '.jpeg', '.gif']:
-        try:
-            # Open and validate image
-            img = Image.open(file)
-            img.verify()  # Verify it's a valid image
-            
-            # Re-open for saving (verify() closes the file)
-            file.seek(0)
-            img = Image.open(file)
-            
-            # Convert to RGB if necessary (for JPEG compatibility)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Resize if too large (max 1200x1200)
-            max_size = (1200, 1200)
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Save optimized image
-            save_ext = 'JPEG' if ext.lower() in ['.jpg', '.jpeg'] else ext.upper().replace('.', '')
-            img.save(file_path, save_ext, quality=85, optimize=True)
-            
-        except Exception as e:
-            raise ValueError(f"Invalid image file: {str(e)}")
+        img = shrink_image(open_upload_image(file.read()))
+        save_ext = 'JPEG' if ext.lower() in ['.jpg', '.jpeg'] else ext.upper().replace('.', '')
+        img.save(file_path, save_ext, quality=85, optimize=True)
     else:
         # For non-image files, just save directly
         file.save(file_path)
@@ -132,19 +139,16 @@ def secure_upload_file(file, upload_folder, max_size_mb=5):
     return secure_name
 
 def send_telegram_alert(message):
+    """Queue a Telegram alert on the background dispatcher (never blocks the request)."""
+    from src.utils.notifier import telegram_dispatcher
+
     token = current_app.config.get('TELEGRAM_TOKEN')
     chat_id = current_app.config.get('TELEGRAM_CHAT_ID')
     
     if not token or not chat_id:
         return False
     
-    try:
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        data = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
-        requests.post(url, data=data, timeout=2)
-        return True
-    except:
-        return False
+    return telegram_dispatcher.submit(token, chat_id, message)
 
 def admin_required(f):
     @wraps(f)
@@ -1,11 +1,11 @@
 import io
-import os
 import qrcode
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
-from flask import current_app
+from src.utils.image_pipeline import rendition_path
+from src.utils.qr_token import make_token
 
 # Design Constants
 GOLD = colors.HexColor("#D4AF37")
@@ -46,8 +46,9 @@ def generate_member_card_pdf(member, plan):
     has_photo = False
     if member.photo_path:
         try:
-            full_path = os.path.join(current_app.static_folder, member.photo_path.replace('static/', ''))
-            if os.path.exists(full_path):
+            # Pre-cropped square rendition; avoids decoding the full-size upload per card
+            full_path = rendition_path(member.photo_path, 'card')
+            if full_path:
                 # Draw User Photo
                 c.drawImage(full_path, photo_x, photo_y, width=photo_size, height=photo_size, mask='auto')
                 has_photo = True
@@ -94,8 +95,8 @@ def generate_member_card_pdf(member, plan):
     
     # 6. QR Code (Positioned lower)
     qr = qrcode.QRCode(box_size=10, border=0)
-    code = member.member_code or str(member.id)
-    qr.add_data(code)
+    # Signed token (member id + expiry) so kiosk scans skip the identifier search
+    qr.add_data(make_token(member.id))
     qr.make(fit=True)
     qr_img = qr.make_image(fill_color="black", back_color="white")
     
@@ -0,0 +1,112 @@
+import hashlib
+import os
+from PIL import Image, ImageOps
+from flask import current_app, url_for
+from src.utils.helpers import allowed_file, open_upload_image, shrink_image, to_rgb
+
+# Fixed renditions generated at upload time: name -> (square edge in px, JPEG quality)
+# `card` is sized for the 24mm photo circle on the ID card at ~300 dpi.
+RENDITIONS = {
+    'thumb': (96, 80),
+    'kiosk': (256, 82),
+    'card': (288, 90),
+}
+MAX_UPLOAD_MB = 10
+RENDITION_DIR = 'renditions'
+
+
+def member_upload_dir():
+    return os.path.join(current_app.static_folder, 'uploads', 'members')
+
+
+def _rendition_name(stem, rendition):
+    edge = RENDITIONS[rendition][0]
+    return f"{stem}-{rendition}{edge}.jpg"
+
+
+def _write_rendition(img, stem, rendition, folder):
+    edge, quality = RENDITIONS[rendition]
+    out_dir = os.path.join(folder, RENDITION_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, _rendition_name(stem, rendition))
+    if not os.path.exists(path):
+        # Centre square crop, then downscale
+        square = ImageOps.fit(img, (edge, edge), Image.Resampling.LANCZOS)
+        square.save(path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return path
+
+
+def save_member_photo(file):
+    """
+    Validates an uploaded photo, stores a normalised original plus every
+    rendition under a content hash, and returns the photo_path to store on
+    the Member (e.g. '3fa9c0...e1.jpg'). Identical uploads share files.
+    """
+    if not file or not file.filename:
+        return None
+    if not allowed_file(file.filename):
+        raise ValueError("File type not allowed")
+
+    data = file.read(MAX_UPLOAD_MB * 1024 * 1024 + 1)
+    if len(data) > MAX_UPLOAD_MB * 1024 * 1024:
+        raise ValueError(f"File size exceeds {MAX_UPLOAD_MB}MB limit")
+
+    img = open_upload_image(data)
+
+    stem = hashlib.sha256(data).hexdigest()[:32]
+    folder = member_upload_dir()
+    os.makedirs(folder, exist_ok=True)
+
+    original = os.path.join(folder, f"{stem}.jpg")
+    if not os.path.exists(original):
+        shrink_image(img).save(original, 'JPEG', quality=85, optimize=True)
+
+    for rendition in RENDITIONS:
+        _write_rendition(img, stem, rendition, folder)
+
+    return f"{stem}.jpg"
+
+
+def rendition_path(photo_path, rendition):
+    """
+    Absolute path of a rendition, generating it from the stored original on
+    first use (covers photos uploaded before renditions existed).
+    Returns None if there is no usable source image.
+    """
+    if not photo_path or rendition not in RENDITIONS:
+        return None
+    folder = member_upload_dir()
+    stem = os.path.splitext(os.path.basename(photo_path))[0]
+    path = os.path.join(folder, RENDITION_DIR, _rendition_name(stem, rendition))
+    if os.path.exists(path):
+        return path
+
+    source = os.path.join(folder, os.path.basename(photo_path))
+    if not os.path.exists(source):
+        return None
+    try:
+        with Image.open(source) as img:
+            return _write_rendition(to_rgb(img), stem, rendition, folder)
+    except Exception as e:
+        print(f"WARNING: Could not build '{rendition}' rendition for {photo_path}: {e}")
+        return None
+
+
+def photo_url(photo_path, rendition='thumb'):
+    """Jinja filter / helper: URL of a member photo rendition (immutable, cacheable)."""
+    if not photo_path:
+        return ''
+    stem = os.path.splitext(os.path.basename(photo_path))[0]
+    return url_for('main.member_media', filename=_rendition_name(stem, rendition))
+
+
+def parse_rendition_name(filename):
+    """'<stem>-kiosk256.jpg' -> ('<stem>.jpg', 'kiosk'), or None if not a known rendition."""
+    base, ext = os.path.splitext(filename)
+    if ext != '.jpg' or '-' not in base:
+        return None
+    stem, spec = base.rsplit('-', 1)
+    for rendition, (edge, _) in RENDITIONS.items():
+        if spec == f"{rendition}{edge}":
+            return f"{stem}.jpg", rendition
+    return None
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from src.models import db, ReportJob
+
+# kind -> callable(params, progress) returning a JSON-serialisable result
+JOB_KINDS = {}
+
+
+def job_kind(name):
+    """Register a report function runnable as a background job."""
+    def decorator(fn):
+        JOB_KINDS[name] = fn
+        return fn
+    return decorator
+
+
+def params_key(kind, params):
+    canonical = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serialisable: {type(value).__name__}")
+
+
+class JobRunner:
+    """
+    Small worker pool for heavy reports, separate from waitress's request
+    threads: requests only enqueue and poll, so a multi-year report never
+    holds one of the 8 threads in main.py. Job state lives in report_jobs,
+    which doubles as the result cache (keyed by kind + params).
+    """
+
+    def __init__(self):
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('REPORT_WORKERS', 2),
+            thread_name_prefix='report-job',
+        )
+        # Jobs that were queued/running when the process stopped will never finish
+        with app.app_context():
+            interrupted = ReportJob.query.filter(ReportJob.status.in_(('queued', 'running'))).update(
+                {'status': 'failed', 'error': 'Interrupted by a server restart', 'finished_at': datetime.now()},
+                synchronize_session=False,
+            )
+            db.session.commit()
+            if interrupted:
+                print(f"INFO: Marked {interrupted} interrupted report job(s) as failed.")
+
+    def submit(self, kind, params=None):
+        """
+        Returns the ReportJob for (kind, params): a fresh cached result, an
+        identical job already in flight, or a newly queued one.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown report: {kind}")
+        params = params or {}
+        key = params_key(kind, params)
+        fresh_after = datetime.now() - timedelta(seconds=self.app.config.get('REPORT_CACHE_SECONDS', 3600))
+
+        with self._lock:
+            existing = ReportJob.query.filter(
+                ReportJob.params_key == key,
+                (ReportJob.status.in_(('queued', 'running'))) |
+                ((ReportJob.status == 'done') & (ReportJob.finished_at >= fresh_after))
+            ).order_by(ReportJob.created_at.desc()).first()
+            if existing:
+                return existing
+
+            job = ReportJob(
+                id=uuid.uuid4().hex,
+                kind=kind,
+                params=json.dumps(params, sort_keys=True, default=str),
+                params_key=key,
+            )
+            db.session.add(job)
+            self._prune()
+            db.session.commit()
+
+        self._executor.submit(self._run, job.id)
+        return job
+
+    def _prune(self):
+        cutoff = datetime.now() - timedelta(days=7)
+        ReportJob.query.filter(ReportJob.created_at < cutoff).delete(synchronize_session=False)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            if job is None:
+                return
+            job.status, job.started_at = 'running', datetime.now()
+            db.session.commit()
+
+            last_write = [0.0]
+
+            def progress(percent):
+                # Throttled: at most ~2 writes a second per job
+                now = time.monotonic()
+                if now - last_write[0] >= 0.5:
+                    last_write[0] = now
+                    job.progress = max(0, min(99, int(percent)))
+                    db.session.commit()
+
+            try:
+                result = JOB_KINDS[job.kind](json.loads(job.params), progress)
+                job.result = json.dumps(result, default=_json_default)
+                job.status, job.progress = 'done', 100
+            except Exception as e:
+                db.session.rollback()
+                job = db.session.get(ReportJob, job_id)
+                job.status, job.error = 'failed', str(e)
+                print(f"WARNING: Report job {job_id} ({job.kind}) failed: {e}")
+            job.finished_at = datetime.now()
+            db.session.commit()
+
+
+job_runner = JobRunner()
+
+
+def serialize(job):
+    data = {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == 'done' and job.result:
+        data['result'] = json.loads(job.result)
+    if job.status == 'failed':
+        data['error'] = job.error
+    return data
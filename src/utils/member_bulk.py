@@ -0,0 +1,130 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, insert, literal
+from src.models import db, Member, Transaction
+from src.utils import daily_stats, rollups
+from src.utils.helpers import generate_invoice_number
+
+CHUNK = 500  # ids per UPDATE ... WHERE id IN (...) (stays under SQLite's parameter limit)
+RENEW_MODES = ('restart', 'extend')
+
+
+def _chunks(ids):
+    for i in range(0, len(ids), CHUNK):
+        yield ids[i:i + CHUNK]
+
+
+def select_ids(member_ids=None, where=None):
+    """Member ids for an explicit selection and/or SQL conditions (src.utils.member_filters)."""
+    query = db.session.query(Member.id)
+    if member_ids is not None:
+        if not member_ids:
+            return []
+        query = query.filter(Member.id.in_(member_ids))
+    if where:
+        query = query.filter(*where)
+    return [member_id for (member_id,) in query.order_by(Member.id)]
+
+
+def _extended_expiry(start, days):
+    """SQL for max(expiry_date, start) + days, per row."""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return func.date(func.max(func.coalesce(Member.expiry_date, start), start), f'+{days} days')
+    if dialect == 'postgresql':
+        return func.greatest(func.coalesce(Member.expiry_date, start), start) + literal(days)
+    raise ValueError(f"Extending memberships is not supported on {dialect}")
+
+
+def renew(ids, plan, start, payment_method='Cash', mode='restart'):
+    """
+    Renew every member in `ids` onto `plan` in one transaction: one UPDATE
+    for the membership columns and one multi-row INSERT for the Renewal
+    transactions (per CHUNK ids), with the report rollups fed the same way.
+
+    mode 'restart' starts the plan on `start` (like a single renewal);
+    'extend' adds the plan's days on top of any time the member has left.
+    Returns a summary dict; nothing is written if anything fails.
+    """
+    if mode not in RENEW_MODES:
+        raise ValueError(f"Unknown renewal mode '{mode}'")
+    values = {
+        Member.plan_id: plan.id,
+        Member.plan_price_at_join: plan.price,
+        Member.status: 'Active',
+        Member.updated_at: datetime.utcnow(),
+    }
+    if mode == 'restart':
+        values[Member.join_date] = start
+        values[Member.expiry_date] = start + timedelta(days=plan.duration_days)
+    else:
+        values[Member.expiry_date] = _extended_expiry(start, plan.duration_days)
+
+    invoice_prefix = generate_invoice_number()
+    paid_at = datetime.combine(start, time())
+    payments = []
+    try:
+        for chunk in _chunks(ids):
+            db.session.query(Member).filter(Member.id.in_(chunk)).update(values, synchronize_session=False)
+            rows = [{
+                'member_id': member_id,
+                'plan_id': plan.id,
+                'amount': plan.price,
+                'date': paid_at,
+                'payment_method': payment_method,
+                'transaction_type': 'Renewal',
+                'invoice_number': f"{invoice_prefix}-{len(payments) + n + 1:05d}",
+                'notes': 'Bulk renewal',
+            } for n, member_id in enumerate(chunk)]
+            db.session.execute(insert(Transaction), rows)
+            payments.extend(rows)
+        if payments:
+            # Core writes skip the model events that maintain the report tables
+            connection = db.session.connection()
+            rollups.record_transactions(connection, payments)
+            daily_stats.record_transactions(connection, payments)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    resync_member_caches()
+    return {
+        'action': 'renew',
+        'members': len(ids),
+        'transactions': len(payments),
+        'revenue': plan.price * len(payments),
+        'plan': plan.name,
+        'mode': mode,
+        'start': start,
+        'expiry_date': values[Member.expiry_date] if mode == 'restart' else None,
+    }
+
+
+def set_status(ids, status):
+    """Set `status` on every member in `ids` with one UPDATE per CHUNK ids; returns a summary dict."""
+    changed = 0
+    try:
+        for chunk in _chunks(ids):
+            changed += db.session.query(Member).filter(
+                Member.id.in_(chunk), Member.status != status
+            ).update({Member.status: status, Member.updated_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if changed:
+        resync_member_caches()
+    return {'action': 'status', 'status': status, 'members': len(ids), 'changed': changed}
+
+
+def resync_member_caches():
+    """Refresh the in-memory member caches after bulk writes (the search index follows via triggers)."""
+    from src.utils.member_index import member_index
+    from src.utils.typeahead import member_typeahead
+    from src.utils.cohorts import cohort_cache
+    from src.utils.series_cache import series_cache
+    from src.utils.pagination import count_cache
+    member_index.clear()
+    cohort_cache.clear()
+    series_cache.clear()
+    count_cache.clear()
+    member_typeahead.build()
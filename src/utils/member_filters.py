@@ -0,0 +1,56 @@
+from datetime import timedelta
+from src.models import Member
+
+# Membership states derived from expiry_date, as SQL conditions on active members.
+# Same boundaries as the kiosk's membership_state(): grace = expired within
+# GRACE_PERIOD_DAYS, expired = past the grace window.
+STATES = ('current', 'expiring', 'grace', 'expired')
+STATUSES = ('Active', 'Inactive')
+EXPIRING_DAYS = 7
+
+
+def state_condition(state, today, grace_days, expiring_days=EXPIRING_DAYS):
+    """WHERE clause for a derived state; a range on (status, expiry_date), so the composite index applies."""
+    active = Member.status == 'Active'
+    if state == 'current':
+        return active & (Member.expiry_date >= today)
+    if state == 'expiring':
+        return active & Member.expiry_date.between(today, today + timedelta(days=expiring_days))
+    if state == 'grace':
+        return active & (Member.expiry_date < today) & (Member.expiry_date >= today - timedelta(days=grace_days))
+    if state == 'expired':
+        return active & (Member.expiry_date < today - timedelta(days=grace_days))
+    return None
+
+
+def parse(args):
+    """
+    The member-list filters present in `args` (request.args), validated:
+    state, status, plan (id) and expiring_days. Unknown values are dropped.
+    """
+    filters = {}
+    if args.get('state') in STATES:
+        filters['state'] = args['state']
+    if args.get('status') in STATUSES:
+        filters['status'] = args['status']
+    plan = args.get('plan', type=int)
+    if plan is not None:
+        filters['plan'] = plan
+    days = args.get('expiring_days', type=int)
+    if days is not None and 0 < days <= 365:
+        filters['expiring_days'] = days
+    return filters
+
+
+def conditions(filters, today, grace_days):
+    """SQL conditions on Member for parsed filters (AND-ed by the caller)."""
+    where = []
+    if 'state' in filters:
+        where.append(state_condition(
+            filters['state'], today, grace_days, filters.get('expiring_days', EXPIRING_DAYS)
+        ))
+    if 'status' in filters:
+        where.append(Member.status == filters['status'])
+    if 'plan' in filters:
+        where.append(Member.plan_id == filters['plan'])
+    return where
@@ -0,0 +1,287 @@
+import csv
+import io
+import re
+from datetime import date, datetime, time, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from src.models import db, Member, Plan, Transaction
+from src.utils import daily_stats, rollups
+from src.utils.helpers import generate_invoice_number
+from src.utils.member_bulk import resync_member_caches
+from src.utils.member_index import normalize_phone
+
+try:  # Optional: .xlsx support when openpyxl is installed
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+BATCH_SIZE = 500
+MAX_ERRORS = 500  # per-row errors kept for the report; the count is always exact
+
+# Normalised header (lower-case, no spaces/underscores/dashes) -> field
+HEADERS = {
+    'name': 'name', 'fullname': 'name', 'membername': 'name',
+    'phone': 'phone', 'mobile': 'phone', 'phonenumber': 'phone', 'contact': 'phone',
+    'email': 'email', 'emailaddress': 'email',
+    'gender': 'gender', 'address': 'address', 'notes': 'notes', 'status': 'status',
+    'dob': 'date_of_birth', 'dateofbirth': 'date_of_birth', 'birthdate': 'date_of_birth',
+    'joindate': 'join_date', 'joined': 'join_date', 'startdate': 'join_date',
+    'expirydate': 'expiry_date', 'expiry': 'expiry_date', 'enddate': 'expiry_date',
+    'plan': 'plan', 'planname': 'plan', 'membership': 'plan',
+    'amount': 'amount', 'amountpaid': 'amount', 'paid': 'amount',
+    'paymentmethod': 'payment_method', 'payment': 'payment_method',
+    'emergencycontact': 'emergency_contact_name', 'emergencyphone': 'emergency_contact_phone',
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d')
+
+
+# --- READING (streamed, one row at a time) ---
+def _csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()  # leave the upload's stream open for its owner
+
+
+def _xlsx_rows(stream):
+    if openpyxl is None:
+        raise ValueError("XLSX import needs openpyxl installed; save the sheet as CSV instead.")
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, filename):
+    """Yield (line_number, {field: raw value}) from a CSV or XLSX file, skipping blank lines."""
+    rows = _xlsx_rows(stream) if filename.lower().endswith('.xlsx') else _csv_rows(stream)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("The file is empty.")
+    fields = [HEADERS.get(re.sub(r'[\s_\-]', '', str(h or '').lower())) for h in header]
+    if 'name' not in fields:
+        raise ValueError("No 'Name' column found in the header row.")
+    for line, values in enumerate(rows, start=2):
+        if all(v is None or str(v).strip() == '' for v in values):
+            continue
+        yield line, {field: value for field, value in zip(fields, values) if field}
+
+
+# --- VALIDATION ---
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet numbers: 9876543210.0 -> '9876543210'
+    return str(value).strip()
+
+
+def _date(value, label):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"{label}: unrecognised date '{value}'")
+
+
+def _member_values(raw, plans, default_plan, today):
+    """(member insert dict, opening payment amount) for one row; raises ValueError with the reason."""
+    name = _text(raw.get('name'))
+    if not name:
+        raise ValueError("Name is required")
+    if len(name) > 100:
+        raise ValueError("Name is longer than 100 characters")
+    email = _text(raw.get('email'))
+    if email and '@' not in email:
+        raise ValueError(f"Invalid email '{email}'")
+
+    plan_key = _text(raw.get('plan')).lower()
+    plan = plans.get(plan_key) if plan_key else default_plan
+    if plan is None:
+        raise ValueError(f"Unknown plan '{raw.get('plan')}'" if plan_key else "No plan given and no default plan")
+
+    join_date = _date(raw.get('join_date'), 'Join date') or today
+    expiry_date = _date(raw.get('expiry_date'), 'Expiry date') or join_date + timedelta(days=plan.duration_days)
+    amount = _text(raw.get('amount'))
+    try:
+        amount = int(float(amount)) if amount else plan.price
+    except ValueError:
+        raise ValueError(f"Invalid amount '{amount}'")
+    if amount < 0:
+        raise ValueError("Amount cannot be negative")
+
+    status = _text(raw.get('status')).lower()
+    member = {
+        'name': name,
+        'phone': _text(raw.get('phone'))[:20] or None,
+        'email': email or None,
+        'gender': _text(raw.get('gender'))[:10] or None,
+        'address': _text(raw.get('address')) or None,
+        'date_of_birth': _date(raw.get('date_of_birth'), 'Date of birth'),
+        'plan_id': plan.id,
+        'plan_price_at_join': plan.price,
+        'join_date': join_date,
+        'expiry_date': expiry_date,
+        'status': 'Inactive' if status in ('inactive', 'no', 'false', '0') else 'Active',
+        'notes': _text(raw.get('notes')) or None,
+        'emergency_contact_name': _text(raw.get('emergency_contact_name'))[:100] or None,
+        'emergency_contact_phone': _text(raw.get('emergency_contact_phone'))[:20] or None,
+        'payment_method': _text(raw.get('payment_method'))[:50] or 'Cash',
+    }
+    return member, amount
+
+
+class MemberImport:
+    """
+    One import run: rows are validated and written in batches of BATCH_SIZE,
+    each batch in its own transaction (one duplicate-phone query, one bulk
+    code allocation, one executemany for members and one for their opening
+    payments). A dry run validates everything and writes nothing.
+    """
+
+    def __init__(self, default_plan=None, dry_run=False, batch_size=BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.today = date.today()
+        self.plans = {}
+        for plan in Plan.query.all():
+            self.plans[str(plan.id)] = plan
+            self.plans[plan.name.lower()] = plan
+        self.default_plan = self.plans.get(str(default_plan).lower()) if default_plan else None
+        self.seen_phones = set()
+        self.existing_phones = None  # normalized phones on file, loaded on first use
+        self.invoice_prefix = generate_invoice_number()
+        self.summary = {'rows': 0, 'valid': 0, 'imported': 0, 'transactions': 0,
+                        'error_count': 0, 'errors': [], 'dry_run': dry_run}
+
+    def error(self, line, message):
+        self.summary['error_count'] += 1
+        if len(self.summary['errors']) < MAX_ERRORS:
+            self.summary['errors'].append((line, message))
+
+    def run(self, rows):
+        batch = []
+        for line, raw in rows:
+            self.summary['rows'] += 1
+            batch.append((line, raw))
+            if len(batch) >= self.batch_size:
+                self._batch(batch)
+                batch = []
+        if batch:
+            self._batch(batch)
+        if self.summary['imported']:
+            resync_member_caches()
+        return self.summary
+
+    def _batch(self, batch):
+        valid = []
+        for line, raw in batch:
+            try:
+                member, amount = _member_values(raw, self.plans, self.default_plan, self.today)
+            except ValueError as e:
+                self.error(line, str(e))
+                continue
+            valid.append((line, member, amount))
+        valid = self._drop_duplicates(valid)
+        self.summary['valid'] += len(valid)
+        if self.dry_run or not valid:
+            return
+        try:
+            self._write(valid)
+        except (SQLAlchemyError, ValueError) as e:
+            db.session.rollback()
+            for line, _, _ in valid:
+                self.error(line, f"Not imported, batch failed: {e}")
+
+    def _phones_on_file(self):
+        """Normalized phones of every existing member, loaded once per import (as member_index does)."""
+        if self.existing_phones is None:
+            rows = db.session.query(Member.phone).filter(Member.phone != None).execution_options(yield_per=5000)
+            self.existing_phones = {normalize_phone(phone) for (phone,) in rows} - {''}
+        return self.existing_phones
+
+    def _drop_duplicates(self, valid):
+        """Reject phones already on file or repeated earlier in the upload, compared normalized on both sides."""
+        existing = self._phones_on_file() if any(m['phone'] for _, m, _ in valid) else set()
+        kept = []
+        for line, member, amount in valid:
+            phone = normalize_phone(member['phone'])
+            if phone and phone in existing:
+                self.error(line, f"Phone {member['phone']} already belongs to a member")
+            elif phone and phone in self.seen_phones:
+                self.error(line, f"Phone {member['phone']} appears more than once in the file")
+            else:
+                if phone:
+                    self.seen_phones.add(phone)
+                kept.append((line, member, amount))
+        return kept
+
+    def _write(self, valid):
+        codes = Member.generate_unique_codes(len(valid))
+        members = []
+        for (_, member, _), code in zip(valid, codes):
+            row = dict(member, member_code=code)
+            del row['payment_method']
+            members.append(row)
+        ids = dict(db.session.execute(insert(Member).returning(Member.member_code, Member.id), members).all())
+
+        payments = []
+        for (_, member, amount), code in zip(valid, codes):
+            if amount <= 0:
+                continue
+            payments.append({
+                'member_id': ids[code],
+                'plan_id': member['plan_id'],
+                'amount': amount,
+                'date': datetime.combine(member['join_date'], time()),
+                'payment_method': member['payment_method'],
+                'transaction_type': 'New Membership',
+                'invoice_number': f"{self.invoice_prefix}-{self.summary['transactions'] + len(payments) + 1:05d}",
+                'notes': 'Imported',
+            })
+        if payments:
+            db.session.execute(insert(Transaction), payments)
+            # Core inserts skip the model events that maintain the report tables
+            connection = db.session.connection()
+            rollups.record_transactions(connection, payments)
+            daily_stats.record_transactions(connection, payments)
+        db.session.commit()
+        self.summary['imported'] += len(members)
+        self.summary['transactions'] += len(payments)
+
+
+def import_members(stream, filename, default_plan=None, dry_run=False):
+    """Import members from an uploaded CSV/XLSX; returns the summary dict (raises ValueError for unreadable files)."""
+    rows = read_rows(stream, filename)
+    return MemberImport(default_plan, dry_run).run(rows)
+
+
+@click.command('import-members')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--plan', 'default_plan', default=None, help='Plan (name or id) for rows without a Plan column.')
+@click.option('--dry-run', is_flag=True, help='Validate the file and report errors without writing anything.')
+@with_appcontext
+def import_members_command(path, default_plan, dry_run):
+    """Bulk-import members (and their opening payments) from a CSV or XLSX file."""
+    with open(path, 'rb') as f:
+        try:
+            summary = import_members(f, path, default_plan, dry_run)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    for line, message in summary['errors']:
+        click.echo(f"  line {line}: {message}")
+    verb = 'would import' if dry_run else 'imported'
+    click.echo(f"{summary['rows']} rows, {summary['valid']} valid, {verb} "
+               f"{summary['valid'] if dry_run else summary['imported']}; {summary['error_count']} errors.")
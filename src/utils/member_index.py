@@ -0,0 +1,236 @@
+import re
+import threading
+from collections import namedtuple
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session, object_session
+from src.models import db, Member, Plan
+
+# Compact, read-only view of a member used by the check-in paths.
+# Holds everything the kiosk needs so no lazy loads happen per tap.
+MemberSnapshot = namedtuple('MemberSnapshot', [
+    'id', 'member_code', 'name', 'phone', 'status',
+    'expiry_date', 'photo_path', 'plan_id', 'plan_name',
+])
+
+
+# Phones compare on the national number, so '+91 98765 43210' and '098765 43210' match '9876543210'
+NATIONAL_DIGITS = 10
+PHONE_SEPARATORS = (' ', '-', '+', '(', ')', '.', '/')
+
+
+def normalize_phone(value):
+    """Digits only, without a country / trunk prefix: '+91 98765-43210' -> '9876543210'."""
+    if not value:
+        return ''
+    return re.sub(r'\D', '', str(value))[-NATIONAL_DIGITS:]
+
+
+def phone_digits(column):
+    """SQL for `column` with the usual phone separators stripped (the SQL side of normalize_phone)."""
+    for separator in PHONE_SEPARATORS:
+        column = func.replace(column, separator, '')
+    return column
+
+
+class MemberIndex:
+    """
+    Process-wide identity index: member_code / id / phone -> MemberSnapshot.
+
+    The whole table is loaded once (one joined query) on first use. Model
+    events on Member and Plan drop stale entries; a dropped or unknown
+    identifier falls back to a single DB query and is cached again.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._by_code = {}
+        self._by_id = {}
+        self._by_phone = {}
+        # Bumped on every invalidation; a DB read that started before one is not cached
+        self._generation = 0
+
+    # --- BUILD ---
+    def _snapshot(self, member, plan_name):
+        return MemberSnapshot(
+            id=member.id,
+            member_code=member.member_code,
+            name=member.name,
+            phone=member.phone,
+            status=member.status,
+            expiry_date=member.expiry_date,
+            photo_path=member.photo_path,
+            plan_id=member.plan_id,
+            plan_name=plan_name,
+        )
+
+    def _put(self, snap):
+        self._by_id[snap.id] = snap
+        if snap.member_code:
+            self._by_code[snap.member_code] = snap
+        phone = normalize_phone(snap.phone)
+        if phone:
+            self._by_phone.setdefault(phone, snap)
+
+    def _query(self):
+        return db.session.query(Member, Plan.name).outerjoin(Plan, Member.plan_id == Plan.id)
+
+    def warm(self):
+        """Load every member into the index with a single query."""
+        generation = self._generation
+        rows = self._query().all()
+        with self._lock:
+            if generation != self._generation:
+                return  # invalidated while loading; the next lookup tries again
+            self._by_code.clear()
+            self._by_id.clear()
+            self._by_phone.clear()
+            for member, plan_name in rows:
+                self._put(self._snapshot(member, plan_name))
+            self._loaded = True
+
+    # --- INVALIDATION ---
+    def discard(self, member_id):
+        """Drop every key pointing at this member (applied after the writing transaction commits)."""
+        with self._lock:
+            self._generation += 1
+            snap = self._by_id.pop(member_id, None)
+            if not snap:
+                return
+            if snap.member_code and self._by_code.get(snap.member_code) is snap:
+                del self._by_code[snap.member_code]
+            phone = normalize_phone(snap.phone)
+            if phone and self._by_phone.get(phone) is snap:
+                del self._by_phone[phone]
+
+    def clear(self):
+        """Forget everything; the next lookup reloads the full table."""
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+            self._by_code.clear()
+            self._by_id.clear()
+            self._by_phone.clear()
+            self._by_phone.clear()
+
+    # --- LOOKUP ---
+    def _find_cached(self, identifier):
+        snap = self._by_code.get(identifier)
+        if not snap and identifier.isdigit():
+            snap = self._by_id.get(int(identifier))
+        if not snap:
+            phone = normalize_phone(identifier)
+            if phone:
+                snap = self._by_phone.get(phone)
+        return snap
+
+    def _cache(self, snap, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._put(snap)
+
+    def _find_in_db(self, identifier):
+        # Same priority as the old three-query chain (code, id, phone) but in one round trip
+        generation = self._generation
+        phone = normalize_phone(identifier)
+        conditions = [Member.member_code == identifier]
+        if identifier.isdigit():
+            conditions.append(Member.id == int(identifier))
+        if phone:
+            # Phones match as in the cache (normalize_phone on both sides): SQL narrows it
+            # down to the same digits, or the same last NATIONAL_DIGITS digits
+            digits = phone_digits(Member.phone)
+            conditions.append(digits.like(f"%{phone}") if len(phone) == NATIONAL_DIGITS else digits == phone)
+        rows = self._query().filter(or_(*conditions)).all()
+
+        def rank(row):
+            member = row[0]
+            if member.member_code == identifier:
+                return 0
+            if identifier.isdigit() and member.id == int(identifier):
+                return 1
+            if phone and normalize_phone(member.phone) == phone:
+                return 2
+            return None
+
+        ranked = [(rank(row), row) for row in rows]
+        ranked = [(r, row) for r, row in ranked if r is not None]
+        if not ranked:
+            return None
+        member, plan_name = min(ranked, key=lambda item: (item[0], item[1][0].id))[1]
+        snap = self._snapshot(member, plan_name)
+        self._cache(snap, generation)
+        return snap
+
+    def lookup(self, identifier):
+        """Resolve a typed or scanned identifier to a MemberSnapshot (or None)."""
+        identifier = str(identifier or '').strip()
+        if not identifier:
+            return None
+        if not self._loaded:
+            self.warm()
+        with self._lock:
+            snap = self._find_cached(identifier)
+        if snap:
+            return snap
+        return self._find_in_db(identifier)
+
+    def get(self, member_id):
+        """Resolve by internal primary key."""
+        if not self._loaded:
+            self.warm()
+        with self._lock:
+            snap = self._by_id.get(member_id)
+        if snap:
+            return snap
+        generation = self._generation
+        row = self._query().filter(Member.id == member_id).first()
+        if not row:
+            return None
+        snap = self._snapshot(*row)
+        self._cache(snap, generation)
+        return snap
+
+
+member_index = MemberIndex()
+
+
+# --- MODEL EVENTS ---
+# Flush-time events only stage the change; entries are dropped once the
+# transaction commits (and the staging is discarded on rollback). Dropping at
+# flush would let a concurrent lookup re-cache the old committed row before
+# our commit, and nothing would ever remove it.
+def _stage(target, key):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('member_index_pending', set()).add(key)
+
+
+@event.listens_for(Member, 'after_insert')
+@event.listens_for(Member, 'after_update')
+@event.listens_for(Member, 'after_delete')
+def _member_changed(mapper, connection, target):
+    _stage(target, target.id)
+
+
+@event.listens_for(Plan, 'after_insert')
+@event.listens_for(Plan, 'after_update')
+@event.listens_for(Plan, 'after_delete')
+def _plan_changed(mapper, connection, target):
+    # Plan names are denormalised into every snapshot; plans change rarely
+    _stage(target, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop('member_index_pending', ())
+    if None in pending:
+        member_index.clear()
+    else:
+        for member_id in pending:
+            member_index.discard(member_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('member_index_pending', None)
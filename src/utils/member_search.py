@@ -0,0 +1,220 @@
+import re
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text, func, or_, case, select, literal, union_all, Integer, Float
+from sqlalchemy.exc import DBAPIError
+from src.models import db, Member
+from src.utils.pagination import encode_cursor, decode_cursor
+from src.utils.member_index import phone_digits
+
+# --- SQLite: FTS5 external-content index over members, kept in sync by triggers ---
+# Triggers (rather than ORM events) also cover bulk imports, restores and raw SQL.
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS member_fts USING fts5(
+        name, phone, member_code,
+        content='members', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS member_fts_vocab USING fts5vocab(member_fts, 'row')",
+    """CREATE TRIGGER IF NOT EXISTS members_fts_ai AFTER INSERT ON members BEGIN
+        INSERT INTO member_fts(rowid, name, phone, member_code) VALUES (new.id, new.name, new.phone, new.member_code);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS members_fts_ad AFTER DELETE ON members BEGIN
+        INSERT INTO member_fts(member_fts, rowid, name, phone, member_code)
+        VALUES ('delete', old.id, old.name, old.phone, old.member_code);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS members_fts_au AFTER UPDATE OF name, phone, member_code ON members BEGIN
+        INSERT INTO member_fts(member_fts, rowid, name, phone, member_code)
+        VALUES ('delete', old.id, old.name, old.phone, old.member_code);
+        INSERT INTO member_fts(rowid, name, phone, member_code) VALUES (new.id, new.name, new.phone, new.member_code);
+    END""",
+]
+
+# --- PostgreSQL: pg_trgm GIN indexes (substring, prefix and similarity in one) ---
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_members_name_trgm ON members USING gin (lower(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_members_phone_trgm ON members USING gin (phone gin_trgm_ops)",
+]
+
+# BM25 column weights: a name hit outranks a phone/code digit-prefix hit
+SQLITE_WEIGHTS = (10.0, 4.0, 6.0)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def ensure_index(rebuild=False):
+    """Create the search index for this database if it is missing; returns True if it was (re)built."""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        existed = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'member_fts'")
+        ).first() is not None
+        for ddl in SQLITE_DDL:
+            db.session.execute(text(ddl))
+        if rebuild or not existed:
+            db.session.execute(text("INSERT INTO member_fts(member_fts) VALUES ('rebuild')"))
+        db.session.commit()
+        return rebuild or not existed
+    if dialect == 'postgresql':
+        for ddl in POSTGRES_DDL:
+            db.session.execute(text(ddl))
+        db.session.commit()
+        return True
+    return False
+
+
+def _tokens(query):
+    return [t.lower() for t in TOKEN_RE.findall(query)]
+
+
+def _edit_distance(a, b, limit):
+    """
+    Edit distance counting an adjacent swap as one edit ("jonh" -> "john"),
+    giving up (returns limit + 1) once it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _fuzzy_terms(token):
+    """Indexed terms within 1-2 edits of `token` (same first letter keeps the vocab scan small)."""
+    limit = 1 if len(token) <= 5 else 2
+    rows = db.session.execute(
+        text("SELECT term FROM member_fts_vocab WHERE term >= :lo AND term < :hi"),
+        {'lo': token[0], 'hi': token[0] + '\uffff'},
+    )
+    n = len(token)
+    # Compare against the term's prefixes around the token's length, so "jonh" reaches "johnson"
+    return [
+        term for (term,) in rows
+        if min(_edit_distance(token, term[:k], limit) for k in (n - 1, n, n + 1)) <= limit
+    ]
+
+
+def _fts_query(groups):
+    # Every query token must match (AND); each token may match any of its spellings (OR)
+    return ' AND '.join(
+        '(' + ' OR '.join(f'"{term}"*' for term in terms) + ')' for terms in groups
+    )
+
+
+def _sqlite_search(tokens, limit, after, where):
+    weights = ', '.join(map(str, SQLITE_WEIGHTS))
+    exact = _fts_query([[t] for t in tokens])
+    match = exact
+    # Typo tolerance: if the exact query can't fill a page, widen alphabetic
+    # tokens of 4+ letters to their near spellings (decided the same way on every page)
+    probe = text("SELECT count(*) FROM (SELECT rowid FROM member_fts WHERE member_fts MATCH :q LIMIT :limit)")
+    if db.session.execute(probe, {'q': exact, 'limit': limit}).scalar() < limit:
+        groups = []
+        for token in tokens:
+            terms = [token]
+            if len(token) >= 4 and token.isalpha():
+                terms += [t for t in _fuzzy_terms(token) if t != token]
+            groups.append(terms)
+        match = _fts_query(groups)
+
+    fts = text(
+        f"SELECT rowid AS id, bm25(member_fts, {weights}) AS score FROM member_fts WHERE member_fts MATCH :q"
+    ).bindparams(q=match).columns(id=Integer, score=Float).subquery('fts')
+    if len(tokens) == 1 and tokens[0].isdigit():
+        # FTS only matches a phone from its first digit; the last few digits of a
+        # number need a substring scan. Those hits rank after every FTS hit (bm25 < 0).
+        phone = select(Member.id, literal(0.0)).where(phone_digits(Member.phone).like(f"%{tokens[0]}%"))
+        hits = union_all(select(fts.c.id, fts.c.score), phone).subquery('hits')
+        fts = select(hits.c.id.label('id'), func.min(hits.c.score).label('score'))\
+            .group_by(hits.c.id).subquery('fts')
+    stmt = select(fts.c.id, fts.c.score)
+    if where:
+        stmt = stmt.join(Member, Member.id == fts.c.id).where(*where)
+    if after:
+        stmt = stmt.where((fts.c.score > after[0]) | ((fts.c.score == after[0]) & (fts.c.id > after[1])))
+    return db.session.execute(stmt.order_by(fts.c.score, fts.c.id).limit(limit + 1)).all()
+
+
+def _postgres_search(query, limit, after, where):
+    q = query.lower()
+    name = func.lower(Member.name)
+    prefix = or_(name.like(f"{q}%"), name.like(f"% {q}%"), Member.phone.like(f"{q}%"), Member.member_code.like(f"{q}%"))
+    # Prefix hits first, then by word similarity (one sortable score for the keyset)
+    score = case((prefix, 0.0), else_=1.0) - func.word_similarity(q, name)
+    rows = db.session.query(Member.id, score).filter(
+        or_(prefix, name.op('%>')(q), Member.phone.like(f"%{q}%")),  # %> = word_similarity, uses the trigram index
+        *where
+    )
+    if after:
+        rows = rows.filter((score > after[0]) | ((score == after[0]) & (Member.id > after[1])))
+    return rows.order_by(score, Member.id).limit(limit + 1).all()
+
+
+def _like_search(query, limit, after, where):
+    like = f"%{query}%"
+    rows = db.session.query(Member.id, Member.id).filter(
+        or_(Member.name.ilike(like), Member.phone.ilike(like), Member.member_code.ilike(like)),
+        *where
+    )
+    if after:
+        rows = rows.filter(Member.id < after[1])
+    # Score is the id itself here (newest first)
+    return [(member_id, 0) for member_id, _ in rows.order_by(Member.id.desc()).limit(limit + 1)]
+
+
+def search_page(query, limit=10, after=None, where=()):
+    """
+    One page of ranked member ids for a free-text query (name / phone / code)
+    plus the cursor for the next page (None on the last page). Pages are
+    keyset on (score, id), so "load more" never re-ranks earlier results.
+    `where` are extra conditions on Member (e.g. src.utils.member_filters).
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return [], None
+    cursor = decode_cursor(after) if after else None
+    dialect = _dialect()
+    rows = None
+    try:
+        if dialect == 'sqlite':
+            rows = _sqlite_search(tokens, limit, cursor, where)
+        elif dialect == 'postgresql':
+            rows = _postgres_search(' '.join(tokens), limit, cursor, where)
+    except DBAPIError as e:
+        # Index missing (e.g. FTS5 / pg_trgm unavailable): keep search working the slow way
+        db.session.rollback()
+        print(f"WARNING: Member search index unavailable, using ILIKE: {e}")
+    if rows is None:
+        rows = _like_search(query, limit, cursor, where)
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(rows) > limit else None
+    return [member_id for member_id, _ in page], next_cursor
+
+
+def search(query, limit=10):
+    """Ranked member ids for a free-text query (first page only)."""
+    return search_page(query, limit)[0]
+
+
+@click.command('rebuild-member-search')
+@with_appcontext
+def rebuild_member_search_command():
+    """(Re)build the member full-text search index from the members table."""
+    if ensure_index(rebuild=True):
+        click.echo(f"Member search index rebuilt ({_dialect()}).")
+    else:
+        click.echo(f"No search index for {_dialect()}; searches fall back to ILIKE.")
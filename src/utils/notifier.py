@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- CONFIGURATION ---
+QUEUE_SIZE = 500          # Max messages waiting before we start dropping
+COALESCE_SECONDS = 3      # Burst window merged into one digest message
+MAX_DIGEST_CHARS = 3500   # Telegram hard limit is 4096 per message
+SEND_TIMEOUT = 5
+
+
+class TelegramDispatcher:
+    """
+    Background sender for Telegram alerts.
+
+    Request threads only enqueue (never block on the network). A single
+    worker drains the bounded queue, merges everything that arrives within
+    COALESCE_SECONDS into one digest per chat, and posts it over a pooled
+    HTTP session. When the queue is full new messages are dropped and counted.
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE, coalesce_seconds=COALESCE_SECONDS):
+        self.coalesce_seconds = coalesce_seconds
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._session = None
+        self._stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'sent': 0,
+            'failed': 0,
+            'digests': 0,
+            'last_latency_ms': None,
+            'max_latency_ms': 0,
+            'total_latency_ms': 0,
+        }
+
+    # --- PRODUCER SIDE ---
+    def submit(self, token, chat_id, message):
+        """Queue a message; returns False if it was dropped under back-pressure."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((token, chat_id, message))
+        except queue.Full:
+            self._bump('dropped')
+            return False
+        self._bump('enqueued')
+        return True
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data['queue_depth'] = self._queue.qsize()
+        data['queue_capacity'] = self._queue.maxsize
+        data['avg_latency_ms'] = round(data['total_latency_ms'] / data['digests']) if data['digests'] else None
+        data['worker_alive'] = bool(self._worker and self._worker.is_alive())
+        return data
+
+    # --- WORKER SIDE ---
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name='telegram-dispatcher', daemon=True)
+            self._worker.start()
+
+    def _http(self):
+        if self._session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=1))
+            self._session = session
+        return self._session
+
+    def _collect_burst(self, first):
+        """Gather everything that arrives within the coalescing window."""
+        batch = [first]
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _digests(self, batch):
+        """Group messages per (token, chat) and split into Telegram-sized texts."""
+        grouped = {}
+        for token, chat_id, message in batch:
+            grouped.setdefault((token, chat_id), []).append(message)
+
+        for (token, chat_id), messages in grouped.items():
+            chunk, size = [], 0
+            for message in messages:
+                if chunk and size + len(message) > MAX_DIGEST_CHARS:
+                    yield token, chat_id, chunk
+                    chunk, size = [], 0
+                chunk.append(message)
+                size += len(message) + 1
+            if chunk:
+                yield token, chat_id, chunk
+
+    def _send(self, token, chat_id, messages):
+        text = messages[0] if len(messages) == 1 else f"🔔 {len(messages)} updates\n\n" + "\n".join(messages)
+        url = f"https://api.telegram.org/bot{token}/sendMessage"
+        started = time.monotonic()
+        try:
+            resp = self._http().post(url, data={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}, timeout=SEND_TIMEOUT)
+            ok = resp.ok
+        except requests.RequestException:
+            ok = False
+        latency = round((time.monotonic() - started) * 1000)
+
+        with self._lock:
+            self._stats['digests'] += 1
+            self._stats['last_latency_ms'] = latency
+            self._stats['total_latency_ms'] += latency
+            self._stats['max_latency_ms'] = max(self._stats['max_latency_ms'], latency)
+            self._stats['sent' if ok else 'failed'] += len(messages)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = self._collect_burst(first)
+            for token, chat_id, messages in self._digests(batch):
+                try:
+                    self._send(token, chat_id, messages)
+                except Exception as e:
+                    print(f"WARNING: Telegram dispatch failed: {e}")
+
+
+telegram_dispatcher = TelegramDispatcher()
@@ -0,0 +1,128 @@
+import base64
+import json
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import case
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+# --- CURSORS ---
+def encode_cursor(value, row_id):
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, column=None):
+    """(value, id) from a cursor, with the value converted back to the column's type. None if invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if value is not None and column is not None and column.type.python_type is date:
+            value = date.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+# --- KEYSET CONDITIONS ---
+def _after(column, id_column, desc, value, row_id):
+    """Rows strictly after (value, row_id) in the order `column` [desc], NULLs last, then id."""
+    id_after = id_column < row_id if desc else id_column > row_id
+    if column is id_column:
+        return id_after
+    if value is None:
+        return column.is_(None) & id_after
+    beyond = column < value if desc else column > value
+    cond = beyond | ((column == value) & id_after)
+    return cond | column.is_(None) if column.nullable else cond
+
+
+def _before(column, id_column, desc, value, row_id):
+    """Rows strictly before (value, row_id) in the same order."""
+    id_before = id_column > row_id if desc else id_column < row_id
+    if column is id_column:
+        return id_before
+    if value is None:
+        return column.isnot(None) | (column.is_(None) & id_before)
+    ahead = column > value if desc else column < value
+    cond = ahead | ((column == value) & id_before)
+    return column.isnot(None) & cond if column.nullable else cond
+
+
+def _order(column, id_column, desc, reverse=False):
+    d = desc != reverse
+    order = []
+    if column is not id_column:
+        if column.nullable:
+            nulls = case((column.is_(None), 1), else_=0)
+            order.append(nulls.desc() if reverse else nulls.asc())
+        order.append(column.desc() if d else column.asc())
+    order.append(id_column.desc() if d else id_column.asc())
+    return order
+
+
+def keyset_page(query, column, id_column, desc=False, after=None, before=None, per_page=10, key=None):
+    """
+    One page of `query` ordered by (column, id) without OFFSET: the cursor
+    (last / first row's sort key) becomes a WHERE clause that an index on
+    `column` can seek to, so page 300 costs the same as page 1.
+
+    `key(row)` returns the (value, id) of a result row; `after` / `before`
+    are cursors from a previous Page.
+    """
+    key = key or (lambda row: (getattr(row, column.key), getattr(row, id_column.key)))
+    cursor = decode_cursor(before or after, column) if (before or after) else None
+
+    if before and cursor:
+        rows = query.filter(_before(column, id_column, desc, *cursor))\
+            .order_by(*_order(column, id_column, desc, reverse=True)).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return Page(
+            items,
+            encode_cursor(*key(items[-1])) if items else None,
+            encode_cursor(*key(items[0])) if items and more else None,
+        )
+
+    if cursor:
+        query = query.filter(_after(column, id_column, desc, *cursor))
+    rows = query.order_by(*_order(column, id_column, desc)).limit(per_page + 1).all()
+    items = rows[:per_page]
+    return Page(
+        items,
+        encode_cursor(*key(items[-1])) if len(rows) > per_page else None,
+        encode_cursor(*key(items[0])) if items and cursor else None,
+    )
+
+
+# --- CACHED COUNTS ---
+class CountCache:
+    """COUNT(*) results reused for `ttl` seconds; list pages show them as approximate."""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def get(self, key, count_fn):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._counts.get(key)
+            if hit and now - hit[0] < self.ttl:
+                return hit[1]
+        value = count_fn()
+        with self._lock:
+            self._counts[key] = (now, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+count_cache = CountCache()
@@ -0,0 +1,138 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, func, extract, cast, Integer
+from sqlalchemy.orm import Session, object_session
+from src.models import db, Attendance
+
+WINDOWS = (7, 30, 90, 365)
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+REFRESH_SECONDS = 3600
+
+
+def _hour_expr():
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.strftime('%H', Attendance.timestamp), Integer)
+    return extract('hour', Attendance.timestamp)
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class PeakHours:
+    """
+    Check-in counts per (day, hour) for the last max(WINDOWS) days, loaded
+    with one grouped query and then bumped in place as check-ins commit.
+    Any window's weekday x hour matrix is folded from these day rows, so
+    the raw Attendance table is only scanned on load and on the hourly
+    refresh (which also picks up deletes and backdated rows).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._days = {}  # date -> [24 counts]
+        self._loaded_at = None
+
+    def load(self):
+        since = date.today() - timedelta(days=max(WINDOWS) - 1)
+        hour = _hour_expr()
+        rows = db.session.query(Attendance.date, hour, func.count(Attendance.id)).filter(
+            Attendance.date >= since
+        ).group_by(Attendance.date, hour).all()
+
+        days = {}
+        for day, h, count in rows:
+            if day is None or h is None:
+                continue
+            days.setdefault(_as_date(day), [0] * 24)[int(h)] += count
+        with self._lock:
+            self._days = days
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_SECONDS:
+            self.load()
+
+    def record(self, ts):
+        """Count a committed check-in (no-op until the first load)."""
+        if not isinstance(ts, datetime) or self._loaded_at is None:
+            return
+        with self._lock:
+            self._days.setdefault(ts.date(), [0] * 24)[ts.hour] += 1
+
+    def matrix(self, days=30, today=None):
+        """
+        Weekday x hour histogram for the last `days` days:
+        {'matrix': 7x24 counts (Mon first), 'averages': per-occurrence means, ...}
+        """
+        self._ensure_loaded()
+        today = today or date.today()
+        start = today - timedelta(days=days - 1)
+
+        counts = [[0] * 24 for _ in WEEKDAYS]
+        occurrences = [0] * 7
+        with self._lock:
+            cursor = start
+            while cursor <= today:
+                occurrences[cursor.weekday()] += 1
+                hours = self._days.get(cursor)
+                if hours:
+                    row = counts[cursor.weekday()]
+                    for h, value in enumerate(hours):
+                        row[h] += value
+                cursor += timedelta(days=1)
+            # Keep memory bounded to the largest window
+            horizon = today - timedelta(days=max(WINDOWS))
+            for stale in [d for d in self._days if d < horizon]:
+                del self._days[stale]
+
+        averages = [
+            [round(value / occurrences[wd], 1) if occurrences[wd] else 0 for value in row]
+            for wd, row in enumerate(counts)
+        ]
+        peak_value, peak_day, peak_hour = max(
+            (value, wd, h) for wd, row in enumerate(counts) for h, value in enumerate(row)
+        )
+        return {
+            'days': days,
+            'start': start.isoformat(),
+            'end': today.isoformat(),
+            'weekdays': list(WEEKDAYS),
+            'matrix': counts,
+            'averages': averages,
+            'total': sum(map(sum, counts)),
+            'peak': {'weekday': WEEKDAYS[peak_day], 'hour': peak_hour, 'count': peak_value} if peak_value else None,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._days = {}
+            self._loaded_at = None
+
+
+peak_hours = PeakHours()
+
+
+# --- MODEL EVENTS ---
+# Same staging as the cooldown cache: only committed check-ins are counted.
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('peak_pending', []).append(target.timestamp)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for ts in session.info.pop('peak_pending', []):
+        peak_hours.record(ts)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('peak_pending', None)
@@ -0,0 +1,73 @@
+import base64
+import hashlib
+import hmac
+import time
+from flask import current_app
+from src.utils.member_index import member_index
+
+# Card QR payload: IL1.<member id, base36>.<expiry unix day, base36>.<signature>
+# Kept short so the QR stays low-density and scans fast on cheap kiosk cameras.
+TOKEN_VERSION = 'IL1'
+SIGNATURE_BYTES = 12
+SECONDS_PER_DAY = 86400
+
+
+def _b36(value):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while True:
+        value, rem = divmod(value, 36)
+        out = digits[rem] + out
+        if not value:
+            return out
+
+
+def _secret():
+    secret = current_app.config.get('QR_TOKEN_SECRET') or current_app.config['SECRET_KEY']
+    return secret.encode() if isinstance(secret, str) else secret
+
+
+def _sign(payload):
+    digest = hmac.new(_secret(), payload.encode(), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def is_token(value):
+    return isinstance(value, str) and value.startswith(TOKEN_VERSION + '.')
+
+
+def make_token(member_id, ttl_days=None):
+    """Signed card token for a member, valid for QR_TOKEN_TTL_DAYS (card lifetime)."""
+    if ttl_days is None:
+        ttl_days = current_app.config.get('QR_TOKEN_TTL_DAYS', 730)
+    expiry_day = int(time.time() // SECONDS_PER_DAY) + ttl_days
+    payload = f"{TOKEN_VERSION}.{_b36(member_id)}.{_b36(expiry_day)}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token):
+    """Returns the member id for a valid, unexpired token, otherwise None."""
+    try:
+        version, member_part, expiry_part, signature = token.split('.')
+        if version != TOKEN_VERSION:
+            return None
+        payload = f"{version}.{member_part}.{expiry_part}"
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        if int(expiry_part, 36) < int(time.time() // SECONDS_PER_DAY):
+            return None
+        return int(member_part, 36)
+    except (ValueError, AttributeError):
+        return None
+
+
+def resolve_scan(identifier):
+    """
+    Card scans (signed tokens) resolve straight to a member id in O(1);
+    anything else is typed input and goes through the legacy code/id/phone lookup.
+    """
+    identifier = str(identifier or '').strip()
+    if is_token(identifier):
+        member_id = verify_token(identifier)
+        return member_index.get(member_id) if member_id is not None else None
+    return member_index.lookup(identifier)
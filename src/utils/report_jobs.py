@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from src.utils import rollups, timeseries
+from src.utils.jobs import job_kind
+from src.utils.cohorts import cohort_cache
+from src.utils.peak_hours import peak_hours, WINDOWS as PEAK_WINDOWS
+from src.utils.series_cache import series_cache, compare as compare_series
+
+MAX_RANGE_DAYS = 366 * 10
+CUSTOM_RANGE_METRICS = ('revenue', 'checkins')
+
+
+def _date_range(params):
+    try:
+        start = datetime.strptime(params['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(params['end'], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("start and end are required (YYYY-MM-DD)")
+    if end < start or (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError("Invalid date range")
+    granularity = params.get('granularity', 'month')
+    if granularity not in timeseries.GRANULARITIES:
+        raise ValueError(f"granularity must be one of {timeseries.GRANULARITIES}")
+    return start, end, granularity
+
+
+def _chunked_series(series, start, end, granularity, progress):
+    """Run `series` one year at a time so long ranges report progress."""
+    totals = {}
+    cursor = start
+    span = (end - start).days + 1
+    while cursor <= end:
+        chunk_end = min(cursor.replace(year=cursor.year + 1, month=1, day=1) - timedelta(days=1), end)
+        for bucket, value in series(cursor, chunk_end, granularity):
+            # Week buckets can straddle a year boundary; merge the halves
+            totals[bucket] = totals.get(bucket, 0) + value
+        progress(((chunk_end - start).days + 1) * 100 / span)
+        cursor = chunk_end + timedelta(days=1)
+    return [
+        {'bucket': bucket, 'label': timeseries.label(bucket, granularity), 'value': value}
+        for bucket, value in sorted(totals.items())
+    ]
+
+
+def custom_range(start, end, granularity, compare, progress=None):
+    """
+    Per-metric values, totals and labels for the reports page's custom range
+    panel. Each metric is one cached query (covering the previous period too
+    when comparing).
+    """
+    result = {'metrics': {}, 'labels': []}
+    for n, metric in enumerate(CUSTOM_RANGE_METRICS, start=1):
+        if compare:
+            current, previous = compare_series(metric, start, end, granularity)
+        else:
+            current, previous = series_cache.get(metric, start, end, granularity), None
+        total = sum(v for _, v in current)
+        entry = {'values': [v for _, v in current], 'total': total}
+        if previous is not None:
+            prev_total = sum(v for _, v in previous)
+            entry.update(
+                previous=[v for _, v in previous],
+                previous_total=prev_total,
+                change_pct=round((total - prev_total) * 100 / prev_total, 1) if prev_total else None,
+            )
+        result['metrics'][metric] = entry
+        result['labels'] = [timeseries.label(b, granularity) for b, _ in current]
+        if progress:
+            progress(n * 100 / len(CUSTOM_RANGE_METRICS))
+    return result
+
+
+# --- REPORT KINDS ---
+@job_kind('revenue_trend')
+def revenue_trend(params, progress):
+    start, end, granularity = _date_range(params)
+    return _chunked_series(rollups.revenue_series, start, end, granularity, progress)
+
+
+@job_kind('checkin_trend')
+def checkin_trend(params, progress):
+    start, end, granularity = _date_range(params)
+    return _chunked_series(timeseries.checkins, start, end, granularity, progress)
+
+
+@job_kind('retention')
+def retention(params, progress):
+    months = min(max(int(params.get('months', 12)), 1), 120)
+    return cohort_cache.retention(months)
+
+
+@job_kind('peak_hours')
+def peak_hours_histogram(params, progress):
+    days = int(params.get('days', 30))
+    if days not in PEAK_WINDOWS:
+        raise ValueError(f"days must be one of {list(PEAK_WINDOWS)}")
+    return peak_hours.matrix(days)
+
+
+@job_kind('custom_range')
+def custom_range_job(params, progress):
+    start, end, granularity = _date_range(params)
+    return custom_range(start, end, granularity, bool(params.get('compare')), progress)
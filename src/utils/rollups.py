@@ -0,0 +1,292 @@
+from datetime import date, datetime, timedelta
+import click
+from dateutil.relativedelta import relativedelta
+from flask.cli import with_appcontext
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models import db, Transaction, Expense, RevenueRollup, ExpenseRollup
+from src.utils import timeseries
+
+
+def upsert_add(connection, table, keys, deltas):
+    """
+    Add `deltas` to the counter columns of the row identified by `keys`,
+    creating it if needed. Runs on the caller's connection so it shares the
+    surrounding transaction.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table)
+        stmt = insert.values(**keys, **deltas).on_conflict_do_update(
+            index_elements=[table.c[k] for k in keys],
+            set_={c: table.c[c] + insert.excluded[c] for c in deltas},
+        )
+        connection.execute(stmt)
+        return
+
+    # Generic fallback: update, insert if the row doesn't exist yet
+    where = [table.c[k] == v for k, v in keys.items()]
+    result = connection.execute(
+        table.update().where(*where).values({c: table.c[c] + v for c, v in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**keys, **deltas))
+
+
+def _as_day(value):
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value or date.today()
+
+
+def _periods(day):
+    return (('day', day), ('month', day.replace(day=1)))
+
+
+# --- INCREMENTAL UPDATER (model events) ---
+def _transaction_changed(connection, target, sign):
+    day = _as_day(target.date)
+    for granularity, period in _periods(day):
+        upsert_add(connection, RevenueRollup.__table__, {
+            'granularity': granularity,
+            'period': period,
+            'plan_id': target.plan_id or 0,
+            'payment_method': target.payment_method or '',
+            'transaction_type': target.transaction_type or '',
+        }, {'total': sign * (target.amount or 0), 'tx_count': sign})
+
+
+def _expense_changed(connection, target, sign):
+    day = _as_day(target.date)
+    for granularity, period in _periods(day):
+        upsert_add(connection, ExpenseRollup.__table__, {
+            'granularity': granularity,
+            'period': period,
+            'category': target.category or '',
+        }, {'total': sign * (target.amount or 0), 'tx_count': sign})
+
+
+@event.listens_for(Transaction, 'after_insert')
+def _transaction_inserted(mapper, connection, target):
+    _transaction_changed(connection, target, 1)
+
+
+@event.listens_for(Transaction, 'after_delete')
+def _transaction_deleted(mapper, connection, target):
+    _transaction_changed(connection, target, -1)
+
+
+@event.listens_for(Expense, 'after_insert')
+def _expense_inserted(mapper, connection, target):
+    _expense_changed(connection, target, 1)
+
+
+@event.listens_for(Expense, 'after_delete')
+def _expense_deleted(mapper, connection, target):
+    _expense_changed(connection, target, -1)
+
+
+def record_transactions(connection, rows):
+    """
+    Rollup deltas for transactions written with Core bulk inserts (which skip
+    the model events): `rows` are insert dicts, aggregated so each
+    (period, plan, method, type) is upserted once.
+    """
+    totals = {}
+    for row in rows:
+        day = _as_day(row.get('date'))
+        for granularity, period in _periods(day):
+            key = (granularity, period, row.get('plan_id') or 0,
+                   row.get('payment_method') or '', row.get('transaction_type') or '')
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + (row.get('amount') or 0), count + 1)
+    for (granularity, period, plan_id, method, tx_type), (total, count) in totals.items():
+        upsert_add(connection, RevenueRollup.__table__, {
+            'granularity': granularity,
+            'period': period,
+            'plan_id': plan_id,
+            'payment_method': method,
+            'transaction_type': tx_type,
+        }, {'total': total, 'tx_count': count})
+
+
+# --- READ SIDE ---
+def revenue_series(start, end, granularity='day', transaction_type=None):
+    """
+    Zero-filled [(bucket, total), ...] from the rollup instead of raw transactions.
+    Monthly series read month rows only for months wholly inside [start, end];
+    a partial first/last month is summed from its day rows, clipped to the range.
+    """
+    def rows(source, lo, hi):
+        filters = [RevenueRollup.granularity == source]
+        if transaction_type:
+            filters.append(RevenueRollup.transaction_type == transaction_type)
+        return timeseries.aggregate(func.sum(RevenueRollup.total), RevenueRollup.period, lo, hi, granularity, filters)
+
+    if granularity != 'month':
+        return rows('day', start, end)
+
+    full_start = start if start.day == 1 else start.replace(day=1) + relativedelta(months=1)
+    full_end = end if (end + timedelta(days=1)).day == 1 else end.replace(day=1) - timedelta(days=1)
+    if full_start > full_end:
+        return rows('day', start, end)
+    totals = dict(rows('month', full_start, full_end))
+    edges = []
+    if start < full_start:
+        edges += rows('day', start, full_start - timedelta(days=1))
+    if end > full_end:
+        edges += rows('day', full_end + timedelta(days=1), end)
+    for bucket, value in edges:
+        totals[bucket] = totals.get(bucket, 0) + value
+    return [(bucket, totals.get(bucket, 0)) for bucket in timeseries.bucket_range(start, end, 'month')]
+
+
+def revenue_total(start, end, transaction_type=None, measure='total'):
+    """Sum of `total` (or `tx_count`) for [start, end]; a whole calendar month reads its single month row."""
+    column = getattr(RevenueRollup, measure)
+    query = db.session.query(func.sum(column))
+    if start.day == 1 and end == start + relativedelta(months=1) - timedelta(days=1):
+        query = query.filter(RevenueRollup.granularity == 'month', RevenueRollup.period == start)
+    else:
+        query = query.filter(RevenueRollup.granularity == 'day', RevenueRollup.period.between(start, end))
+    if transaction_type:
+        query = query.filter(RevenueRollup.transaction_type == transaction_type)
+    return query.scalar() or 0
+
+
+def revenue_breakdown(month_start, by):
+    """[(key, total), ...] for one month grouped by 'plan_id', 'payment_method' or 'transaction_type'."""
+    column = getattr(RevenueRollup, by)
+    return db.session.query(column, func.sum(RevenueRollup.total)).filter(
+        RevenueRollup.granularity == 'month',
+        RevenueRollup.period == month_start,
+    ).group_by(column).order_by(func.sum(RevenueRollup.total).desc()).all()
+
+
+def expense_total(month_start):
+    return db.session.query(func.sum(ExpenseRollup.total)).filter(
+        ExpenseRollup.granularity == 'month',
+        ExpenseRollup.period == month_start,
+    ).scalar() or 0
+
+
+def expense_breakdown(month_start):
+    return db.session.query(ExpenseRollup.category, func.sum(ExpenseRollup.total)).filter(
+        ExpenseRollup.granularity == 'month',
+        ExpenseRollup.period == month_start,
+    ).group_by(ExpenseRollup.category).order_by(func.sum(ExpenseRollup.total).desc()).all()
+
+
+# --- BACKFILL ---
+def _rollup_month_rows(day_rows, key_fields):
+    months = {}
+    for row in day_rows:
+        key = (row['period'].replace(day=1),) + tuple(row[k] for k in key_fields)
+        acc = months.setdefault(key, {'total': 0, 'tx_count': 0})
+        acc['total'] += row['total']
+        acc['tx_count'] += row['tx_count']
+    return [
+        {'granularity': 'month', 'period': key[0], **dict(zip(key_fields, key[1:])), **acc}
+        for key, acc in months.items()
+    ]
+
+
+def _backfill_chunk(start, end):
+    """Rebuild both rollups for [start, end) from raw rows with two grouped queries."""
+    rev_table, exp_table = RevenueRollup.__table__, ExpenseRollup.__table__
+    for table in (rev_table, exp_table):
+        db.session.execute(table.delete().where(table.c.period >= start, table.c.period < end))
+
+    tx_day = func.date(Transaction.date)
+    plan = func.coalesce(Transaction.plan_id, 0)
+    method = func.coalesce(Transaction.payment_method, '')
+    tx_type = func.coalesce(Transaction.transaction_type, '')
+    tx_rows = [
+        {'granularity': 'day', 'period': _as_day(day), 'plan_id': plan_id, 'payment_method': pm,
+         'transaction_type': tt, 'total': total or 0, 'tx_count': count}
+        for day, plan_id, pm, tt, total, count in db.session.query(
+            tx_day, plan, method, tx_type, func.sum(Transaction.amount), func.count(Transaction.id)
+        ).filter(Transaction.date >= start, Transaction.date < end).group_by(tx_day, plan, method, tx_type)
+    ]
+
+    category = func.coalesce(Expense.category, '')
+    exp_rows = [
+        {'granularity': 'day', 'period': _as_day(day), 'category': cat, 'total': total or 0, 'tx_count': count}
+        for day, cat, total, count in db.session.query(
+            Expense.date, category, func.sum(Expense.amount), func.count(Expense.id)
+        ).filter(Expense.date >= start, Expense.date < end).group_by(Expense.date, category)
+    ]
+
+    tx_rows += _rollup_month_rows(tx_rows, ('plan_id', 'payment_method', 'transaction_type'))
+    exp_rows += _rollup_month_rows(exp_rows, ('category',))
+    if tx_rows:
+        db.session.execute(rev_table.insert(), tx_rows)
+    if exp_rows:
+        db.session.execute(exp_table.insert(), exp_rows)
+    db.session.commit()
+    return len(tx_rows) + len(exp_rows)
+
+
+def backfill(since=None, chunk_months=3, echo=None):
+    """
+    Rebuild the report rollups from history, `chunk_months` calendar months at
+    a time (each chunk is its own transaction, so memory and lock time stay small).
+    """
+    if since is None:
+        # Full rebuild: also drop periods that no longer have any source rows
+        db.session.execute(RevenueRollup.__table__.delete())
+        db.session.execute(ExpenseRollup.__table__.delete())
+        firsts = [
+            db.session.query(func.min(Transaction.date)).scalar(),
+            db.session.query(func.min(Expense.date)).scalar(),
+        ]
+        firsts = [_as_day(d) for d in firsts if d]
+        if not firsts:
+            db.session.commit()
+            return 0
+        since = min(firsts)
+
+    cursor = since.replace(day=1)
+    stop = (date.today().replace(day=1) + relativedelta(months=1))
+    latest = [
+        db.session.query(func.max(Transaction.date)).scalar(),
+        db.session.query(func.max(Expense.date)).scalar(),
+    ]
+    for d in latest:
+        if d:
+            stop = max(stop, _as_day(d).replace(day=1) + relativedelta(months=1))
+
+    written = 0
+    while cursor < stop:
+        chunk_end = min(cursor + relativedelta(months=chunk_months), stop)
+        written += _backfill_chunk(cursor, chunk_end)
+        if echo:
+            echo(f"  {cursor:%Y-%m} .. {chunk_end - timedelta(days=1):%Y-%m}: done")
+        cursor = chunk_end
+    return written
+
+
+def ensure_built():
+    """First start after upgrading: backfill once if the rollups are empty but history exists."""
+    empty = (db.session.query(RevenueRollup.period).first() is None
+             and db.session.query(ExpenseRollup.period).first() is None)
+    if empty and (db.session.query(Transaction.id).first() or db.session.query(Expense.id).first()):
+        written = backfill()
+        print(f"INFO: Backfilled report rollups ({written} rows).")
+
+
+@click.command('backfill-report-rollups')
+@click.option('--since', default=None, help='First month to rebuild (YYYY-MM). Default: all history.')
+@click.option('--chunk-months', type=int, default=3, show_default=True, help='Months rebuilt per transaction.')
+@with_appcontext
+def backfill_report_rollups_command(since, chunk_months):
+    """Rebuild revenue/expense rollup tables from raw Transaction and Expense rows."""
+    start = datetime.strptime(since, '%Y-%m').date() if since else None
+    written = backfill(start, chunk_months, echo=click.echo)
+    click.echo(f"Report rollups rebuilt: {written} rows.")
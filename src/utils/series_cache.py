@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.models import Attendance, Transaction
+from src.utils import rollups, timeseries
+
+# metric name -> fn(start, end, granularity) returning [(bucket, value), ...] from one grouped query
+METRICS = {
+    'revenue': rollups.revenue_series,
+    'checkins': timeseries.checkins,
+    'attendees': timeseries.distinct_attendees,
+}
+
+
+class SeriesCache:
+    """
+    LRU of report series keyed by (metric, start, end, granularity).
+
+    A window that ended before today can only change through a backdated
+    write, so it is kept until one of those touches its range; a window
+    that includes today is recomputed after `live_ttl` seconds.
+    """
+
+    def __init__(self, max_entries=256, live_ttl=60):
+        self.max_entries = max_entries
+        self.live_ttl = live_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (computed_at, closed, series)
+
+    def get(self, metric, start, end, granularity, today=None):
+        today = today or date.today()
+        key = (metric, start, end, granularity)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (entry[1] or now - entry[0] < self.live_ttl):
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        series = METRICS[metric](start, end, granularity)
+        with self._lock:
+            self._entries[key] = (now, end < today, series)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return series
+
+    def invalidate_day(self, day):
+        """Drop every cached window containing `day` (a backdated write landed there)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] <= day <= k[2]]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+series_cache = SeriesCache()
+
+
+def previous_period(start, end, granularity):
+    """The window of equal length right before [start, end] (whole months for month ranges)."""
+    if granularity == 'month' and start.day == 1 and (end + timedelta(days=1)).day == 1:
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        return start - relativedelta(months=months), start - timedelta(days=1)
+    return start - timedelta(days=(end - start).days + 1), start - timedelta(days=1)
+
+
+def compare(metric, start, end, granularity):
+    """
+    (current, previous) series for [start, end] and the period before it.
+    `previous` is aligned bucket-for-bucket with `current` (zero-padded if
+    shorter). When `start` opens a bucket both periods come from one query
+    over the combined range; otherwise the bucket holding `start` would mix
+    the two periods, so each is queried on its own.
+    """
+    prev_start, prev_end = previous_period(start, end, granularity)
+    if timeseries.bucket_start(start, granularity) == start:
+        series = series_cache.get(metric, prev_start, end, granularity)
+        current = [(b, v) for b, v in series if b >= start]
+        previous = [(b, v) for b, v in series if b < start]
+    else:
+        current = series_cache.get(metric, start, end, granularity)
+        previous = series_cache.get(metric, prev_start, prev_end, granularity)
+    previous = previous[-len(current):] if current else []
+    padding = [(None, 0)] * (len(current) - len(previous))
+    return current, padding + previous
+
+
+# --- INVALIDATION ---
+# Staged until commit (like the cooldown cache) so a reader can't re-cache
+# the old value between our flush and commit.
+def _stage(target, value):
+    session = object_session(target)
+    if isinstance(value, datetime):
+        value = value.date()
+    if session is not None and isinstance(value, date) and value < date.today():
+        session.info.setdefault('series_pending', set()).add(value)
+
+
+@event.listens_for(Attendance, 'after_insert')
+@event.listens_for(Attendance, 'after_delete')
+def _attendance_changed(mapper, connection, target):
+    _stage(target, target.date or target.timestamp)
+
+
+@event.listens_for(Transaction, 'after_insert')
+@event.listens_for(Transaction, 'after_delete')
+def _transaction_changed(mapper, connection, target):
+    _stage(target, target.date)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for day in session.info.pop('series_pending', ()):
+        series_cache.invalidate_day(day)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('series_pending', None)
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, cast, Date
+from src.models import db, Transaction, Attendance
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def bucket_start(value, granularity):
+    """Python-side bucket key for a date: the day itself, its Monday, or the 1st of its month."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def bucket_range(start, end, granularity):
+    """Every bucket key between start and end (inclusive), used to zero-fill gaps."""
+    step = relativedelta(months=1) if granularity == 'month' else timedelta(days=7 if granularity == 'week' else 1)
+    cursor = bucket_start(start, granularity)
+    keys = []
+    while cursor <= end:
+        keys.append(cursor)
+        cursor = cursor + step
+    return keys
+
+
+def bucket_expr(column, granularity):
+    """
+    SQL expression truncating `column` to its bucket start.
+    SQLite has no date_trunc, so it gets the equivalent strftime/date() modifiers.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    if db.engine.dialect.name == 'sqlite':
+        if granularity == 'month':
+            return func.strftime('%Y-%m-01', column)
+        if granularity == 'week':
+            # Monday of the week: step forward to Sunday, then back 6 days
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.date(column)
+
+    return cast(func.date_trunc(granularity, column), Date)
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def aggregate(value_expr, date_column, start, end, granularity='day', filters=()):
+    """
+    One GROUP BY query returning [(bucket_start, value), ...] for every bucket
+    in [start, end], zero-filled in Python.
+
+    value_expr is any aggregate, e.g. func.sum(Transaction.amount),
+    func.count(Attendance.id) or func.count(func.distinct(Attendance.member_id)).
+    """
+    bucket = bucket_expr(date_column, granularity).label('bucket')
+    query = db.session.query(bucket, value_expr).filter(
+        date_column >= start,
+        date_column < end + timedelta(days=1),
+        *filters
+    ).group_by(bucket)
+
+    found = {_as_date(key): value or 0 for key, value in query}
+    return [(key, found.get(key, 0)) for key in bucket_range(start, end, granularity)]
+
+
+# --- COMMON METRICS ---
+def revenue(start, end, granularity='day'):
+    return aggregate(func.sum(Transaction.amount), Transaction.date, start, end, granularity)
+
+
+def checkins(start, end, granularity='day'):
+    return aggregate(func.count(Attendance.id), Attendance.date, start, end, granularity)
+
+
+def distinct_attendees(start, end, granularity='day'):
+    return aggregate(func.count(func.distinct(Attendance.member_id)), Attendance.date, start, end, granularity)
+
+
+def label(bucket, granularity):
+    if granularity == 'month':
+        return bucket.strftime('%b %Y')
+    if granularity == 'week':
+        return f"Wk {bucket.strftime('%d %b')}"
+    return bucket.strftime('%d %b')
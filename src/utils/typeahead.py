@@ -0,0 +1,168 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.models import db, Member
+from src.utils.member_index import normalize_phone
+
+# What a suggestion needs to render; no DB access at query time
+Suggestion = namedtuple('Suggestion', ['id', 'member_code', 'name', 'phone', 'status', 'expiry_date', 'photo_path'])
+
+# Sorts after any key character: (prefix + KEY_END,) bounds the run of keys starting with prefix
+KEY_END = '\U0010ffff'
+
+
+def _keys(s):
+    """Prefix keys for a member: each name word, the full name, the member code and phone digits."""
+    name = (s.name or '').lower().strip()
+    keys = set(name.split())
+    if name:
+        keys.add(name)
+    if s.member_code:
+        keys.add(s.member_code.lower())
+    phone = normalize_phone(s.phone)
+    if phone:
+        keys.add(phone)
+        # The number as stored too, country code included: +91 98765 43210 -> 919876543210
+        keys.add(re.sub(r'\D', '', s.phone))
+    return keys
+
+
+class MemberTypeahead:
+    """
+    In-memory prefix index for member typeahead.
+
+    Every key is stored once as a (key, member_id) tuple in one sorted list,
+    which behaves like a flattened trie: all keys starting with a prefix form
+    one contiguous run found with two bisects. Inserts and removals are
+    `insort` / `del` on that list, applied after the writing transaction commits.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []   # sorted [(key, member_id)]
+        self._members = {}   # member_id -> Suggestion
+        self._loaded = False
+
+    def build(self):
+        rows = db.session.query(
+            Member.id, Member.member_code, Member.name, Member.phone,
+            Member.status, Member.expiry_date, Member.photo_path,
+        ).execution_options(yield_per=5000)
+        members, entries = {}, []
+        for row in rows:
+            s = Suggestion(*row)
+            members[s.id] = s
+            entries.extend((key, s.id) for key in _keys(s))
+        entries.sort()
+        with self._lock:
+            self._members, self._entries, self._loaded = members, entries, True
+
+    # --- MAINTENANCE ---
+    def _remove(self, member_id):
+        old = self._members.pop(member_id, None)
+        if old is None:
+            return
+        for key in _keys(old):
+            i = bisect_left(self._entries, (key, member_id))
+            if i < len(self._entries) and self._entries[i] == (key, member_id):
+                del self._entries[i]
+
+    def put(self, suggestion):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(suggestion.id)
+            self._members[suggestion.id] = suggestion
+            for key in _keys(suggestion):
+                insort(self._entries, (key, suggestion.id))
+
+    def discard(self, member_id):
+        with self._lock:
+            self._remove(member_id)
+
+    # --- QUERY ---
+    def _prefix_ids(self, prefix):
+        """Every (key, member_id) whose key starts with `prefix` (the whole run, so ranking sees all of it)."""
+        entries = self._entries
+        lo = bisect_left(entries, (prefix,))
+        hi = bisect_left(entries, (prefix + KEY_END,), lo)
+        for i in range(lo, hi):
+            yield entries[i]
+
+    def suggest(self, query, limit=8):
+        """Top `limit` members whose name words / code / phone start with the query."""
+        if not self._loaded:
+            self.build()
+        words = query.lower().split()
+        if not words:
+            return []
+        digits = normalize_phone(query)
+        first = digits if digits and len(digits) == len(query.replace(' ', '')) else words[0]
+        rest = [] if first == digits else words[1:]
+
+        today = date.today()
+        with self._lock:
+            best = {}
+            for key, member_id in self._prefix_ids(first):
+                s = self._members[member_id]
+                if rest:
+                    name_words = (s.name or '').lower().split()
+                    if not all(any(w.startswith(r) for w in name_words) for r in rest):
+                        continue
+                # Name starts with the query, then exact key (code / phone / word), then current
+                # members, then shorter names
+                current = s.status == 'Active' and (s.expiry_date is None or s.expiry_date >= today)
+                rank = (not (s.name or '').lower().startswith(first), key != first, not current,
+                        len(s.name or ''), s.name or '')
+                if member_id not in best or rank < best[member_id]:
+                    best[member_id] = rank
+            ranked = heapq.nsmallest(limit, best, key=best.get)
+            return [self._members[member_id] for member_id in ranked]
+
+    def stats(self):
+        with self._lock:
+            return {'members': len(self._members), 'keys': len(self._entries)}
+
+
+member_typeahead = MemberTypeahead()
+
+
+# --- MODEL EVENTS ---
+# Staged per session and applied on commit, like the other in-memory caches.
+def _stage(target, suggestion):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('typeahead_pending', []).append((target.id, suggestion))
+
+
+@event.listens_for(Member, 'after_insert')
+@event.listens_for(Member, 'after_update')
+def _member_saved(mapper, connection, target):
+    _stage(target, Suggestion(
+        target.id, target.member_code, target.name, target.phone,
+        target.status, target.expiry_date, target.photo_path,
+    ))
+
+
+@event.listens_for(Member, 'after_delete')
+def _member_deleted(mapper, connection, target):
+    _stage(target, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for member_id, suggestion in session.info.pop('typeahead_pending', []):
+        if suggestion is None:
+            member_typeahead.discard(member_id)
+        else:
+            member_typeahead.put(suggestion)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop('typeahead_pending', None)
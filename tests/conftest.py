@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+# Point the app at a throwaway SQLite file before src.config is imported
+_DB_DIR = tempfile.mkdtemp(prefix="ironlifter-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import app as flask_app  # noqa: E402
+from src.models import db, Member, Plan, User  # noqa: E402
+
+
+def reset_caches():
+    """Forget every process-wide cache so tests don't see each other's data."""
+    from src.utils.member_index import member_index
+    from src.utils.typeahead import member_typeahead
+    from src.utils.cohorts import cohort_cache
+    from src.utils.series_cache import series_cache
+    from src.utils.peak_hours import peak_hours
+    from src.utils.attendance_columns import attendance_columns
+    from src.utils.pagination import count_cache
+    member_index.clear()
+    cohort_cache.clear()
+    series_cache.clear()
+    peak_hours.clear()
+    attendance_columns.clear()
+    count_cache.clear()
+    member_typeahead.build()
+
+
+@pytest.fixture
+def app():
+    from src.utils.member_search import ensure_index
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        ensure_index(rebuild=True)
+        reset_caches()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    user = User(username="tester", role="admin")
+    user.set_password("secret")
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client
+
+
+@pytest.fixture
+def plan(app):
+    plan = Plan(name="Monthly", price=1000, duration_days=30)
+    db.session.add(plan)
+    db.session.commit()
+    return plan
+
+
+def make_member(plan, name="Test Member", phone=None, join_date=None, **fields):
+    join_date = join_date or date.today()
+    member = Member(
+        member_code=Member.generate_unique_code(),
+        name=name,
+        phone=phone,
+        plan_id=plan.id,
+        plan_price_at_join=plan.price,
+        join_date=join_date,
+        expiry_date=fields.pop("expiry_date", join_date + timedelta(days=plan.duration_days)),
+        **fields,
+    )
+    db.session.add(member)
+    db.session.commit()
+    return member
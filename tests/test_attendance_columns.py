@@ -0,0 +1,69 @@
+import threading
+from datetime import datetime
+
+from src.models import db, Attendance
+from src.utils.attendance_columns import attendance_columns
+
+from conftest import make_member
+
+
+def _checkin(member, ts, row_id=None):
+    db.session.add(Attendance(id=row_id, member_id=member.id, timestamp=ts, date=ts.date()))
+    db.session.commit()
+
+
+def _due_for_append():
+    attendance_columns._appended_at = 0.0
+
+
+def test_append_picks_up_lower_id_committed_late(plan):
+    member = make_member(plan)
+    for row_id, hour in [(1, 6), (2, 7), (4, 9), (5, 10)]:
+        _checkin(member, datetime(2025, 3, 3, hour), row_id)
+    day = (datetime(2025, 3, 3), datetime(2025, 3, 4))
+    assert sum(attendance_columns.hourly_counts(*day)) == 4
+
+    # id 3 was assigned before 4 and 5 but its transaction committed after they were loaded
+    _checkin(member, datetime(2025, 3, 3, 8), 3)
+    _checkin(member, datetime(2025, 3, 3, 11), 6)
+    _due_for_append()
+    hourly = attendance_columns.hourly_counts(*day)
+    assert sum(hourly) == 6
+    assert hourly[8] == 1 and hourly[11] == 1
+
+    _due_for_append()
+    assert sum(attendance_columns.hourly_counts(*day)) == 6  # re-scanned rows are not counted twice
+
+
+def test_readers_are_not_blocked_by_a_reload(app, plan):
+    member = make_member(plan)
+    _checkin(member, datetime(2025, 3, 3, 7))
+    assert attendance_columns.distinct_attendees() == 1
+
+    started, release = threading.Event(), threading.Event()
+    fetch = attendance_columns._fetch
+
+    def slow_fetch(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return fetch(*args, **kwargs)
+
+    def reload():
+        with app.app_context():
+            attendance_columns.refresh(force=True)
+
+    attendance_columns._fetch = slow_fetch
+    try:
+        loader = threading.Thread(target=reload)
+        loader.start()
+        assert started.wait(5)
+        _due_for_append()
+        reader = threading.Thread(target=attendance_columns.stats)
+        reader.start()
+        reader.join(1)
+        assert not reader.is_alive()
+        assert attendance_columns.distinct_attendees() == 1  # served from the current columns meanwhile
+    finally:
+        release.set()
+        loader.join(5)
+        del attendance_columns._fetch
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models import Attendance
+
+from conftest import make_member
+
+
+@pytest.fixture
+def kiosk(app):
+    app.config["KIOSK_SECRET_TOKEN"] = "kiosk-secret"
+    app.config["KIOSK_MAX_OFFLINE_HOURS"] = 72
+    client = app.test_client()
+
+    def post(checkins):
+        return client.post("/api/checkin/batch", json={"checkins": checkins},
+                           headers={"X-Kiosk-Secret": "kiosk-secret"})
+    return post
+
+
+def _entry(member, ts, client_id):
+    return {"member_id": member.member_code, "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%S"), "client_id": client_id}
+
+
+def test_batch_rejects_taps_older_than_offline_window(kiosk, plan):
+    member = make_member(plan)
+    now = datetime.now()
+    response = kiosk([
+        _entry(member, now - timedelta(hours=73), "old"),
+        _entry(member, now - timedelta(hours=2), "recent"),
+    ])
+    assert response.status_code == 200
+    results = {r["client_id"]: r for r in response.get_json()["results"]}
+    assert results["old"]["status"] == "stale"
+    assert results["old"]["success"] is False
+    assert results["recent"]["success"] is True
+    assert Attendance.query.count() == 1
+
+
+def test_oversized_batch_is_413(kiosk, plan):
+    from src.routes.api_routes import MAX_BATCH_CHECKINS
+    member = make_member(plan)
+    now = datetime.now()
+    response = kiosk([_entry(member, now, str(n)) for n in range(MAX_BATCH_CHECKINS + 1)])
+    assert response.status_code == 413
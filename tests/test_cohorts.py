@@ -0,0 +1,46 @@
+import io
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from src.models import db, Member
+from src.utils.cohorts import cohort_cache
+from src.utils.member_import import import_members
+
+from conftest import make_member
+
+
+def _cohort(rows, month):
+    return next(row for row in rows if row["cohort"] == month)
+
+
+def test_renewal_keeps_member_in_original_cohort(client, plan):
+    this_month = date.today().replace(day=1)
+    joined = this_month - relativedelta(months=3)
+    member = make_member(plan, join_date=joined + relativedelta(days=4))
+    assert member.first_join_date == member.join_date
+
+    before = cohort_cache.retention(months=6)
+    assert _cohort(before, joined)["size"] == 1
+
+    response = client.post(f"/members/{member.id}/renew", data={
+        "plan_id": plan.id, "join_date": date.today().isoformat(), "payment_method": "Cash",
+    })
+    assert response.status_code == 302
+    db.session.expire_all()
+    member = db.session.get(Member, member.id)
+    assert member.join_date == date.today()
+    assert member.first_join_date == joined + relativedelta(days=4)
+
+    after = cohort_cache.retention(months=6)
+    assert _cohort(after, joined)["size"] == 1
+    assert _cohort(after, this_month)["size"] == 0
+    assert _cohort(after, joined)["renewed"][-1] == 100.0
+
+
+def test_import_sets_first_join_date(plan):
+    csv = "Name,Phone,Join Date\nAsha,9000000001,2024-05-03\nRavi,9000000002,\n"
+    summary = import_members(io.BytesIO(csv.encode()), "members.csv", default_plan=plan.name)
+    assert summary["imported"] == 2
+    dates = dict(db.session.query(Member.name, Member.first_join_date))
+    assert dates == {"Asha": date(2024, 5, 3), "Ravi": date.today()}
@@ -0,0 +1,46 @@
+import io
+import os
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from src.utils.helpers import MAX_IMAGE_EDGE, secure_upload_file
+from src.utils.image_pipeline import RENDITIONS, RENDITION_DIR, save_member_photo
+
+
+def _upload(size=(2400, 1600), mode="RGBA", name="photo.png"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 0) if mode == "RGBA" else (200, 30, 30)).save(buffer, "PNG")
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename=name)
+
+
+def test_member_photo_is_normalised_with_renditions(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "static_folder", str(tmp_path))
+    photo_path = save_member_photo(_upload())
+    folder = tmp_path / "uploads" / "members"
+    with Image.open(folder / photo_path) as original:
+        assert original.mode == "RGB"
+        assert max(original.size) == MAX_IMAGE_EDGE
+        assert original.getpixel((0, 0)) == (255, 255, 255)  # transparency flattened onto white
+    for rendition, (edge, _) in RENDITIONS.items():
+        stem = os.path.splitext(photo_path)[0]
+        assert (folder / RENDITION_DIR / f"{stem}-{rendition}{edge}.jpg").exists()
+
+
+def test_secure_upload_file_shares_the_normalisation(app, tmp_path):
+    name = secure_upload_file(_upload(), str(tmp_path))
+    with Image.open(tmp_path / name) as saved:
+        assert saved.mode == "RGB"
+        assert max(saved.size) == MAX_IMAGE_EDGE
+
+
+def test_invalid_image_is_rejected(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "static_folder", str(tmp_path))
+    bogus = FileStorage(stream=io.BytesIO(b"not an image"), filename="photo.jpg")
+    try:
+        save_member_photo(bogus)
+    except ValueError as e:
+        assert "Invalid image file" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
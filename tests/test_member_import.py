@@ -0,0 +1,28 @@
+import io
+
+from src.models import Member
+from src.utils.member_import import import_members
+
+from conftest import make_member
+
+
+def _import(plan, text):
+    return import_members(io.BytesIO(text.encode()), "members.csv", default_plan=plan.name)
+
+
+def test_formatted_phone_on_file_is_a_duplicate(plan):
+    make_member(plan, name="Spaced", phone="98765 43210")
+    make_member(plan, name="Prefixed", phone="+91 91234-56789")
+    summary = _import(plan, "Name,Phone\nCopy One,9876543210\nCopy Two,09123456789\nNew Person,9000000009\n")
+    assert summary["imported"] == 1
+    assert [message for _, message in summary["errors"]] == [
+        "Phone 9876543210 already belongs to a member",
+        "Phone 09123456789 already belongs to a member",
+    ]
+    assert Member.query.count() == 3
+
+
+def test_repeated_phone_within_the_file_is_rejected(plan):
+    summary = _import(plan, "Name,Phone\nFirst,98765 43210\nSecond,+91 9876543210\n")
+    assert summary["imported"] == 1
+    assert summary["errors"] == [(3, "Phone +91 9876543210 appears more than once in the file")]
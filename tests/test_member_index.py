@@ -0,0 +1,66 @@
+import threading
+from datetime import date, timedelta
+
+from src.models import db, Member
+from src.utils.member_index import member_index
+from conftest import make_member
+
+
+def test_lookup_sees_renewal_after_commit(client, plan):
+    member = make_member(plan, expiry_date=date.today() - timedelta(days=30))
+    assert member_index.lookup(member.member_code).expiry_date == member.expiry_date
+
+    response = client.post(f"/members/{member.id}/renew", data={"plan_id": plan.id})
+    assert response.status_code == 302
+
+    renewed = db.session.get(Member, member.id)
+    assert member_index.lookup(member.member_code).expiry_date == renewed.expiry_date
+    assert renewed.expiry_date == date.today() + timedelta(days=plan.duration_days)
+
+
+def test_lookup_between_flush_and_commit_is_not_cached(app, plan):
+    member = make_member(plan, status="Active")
+    member_index.clear()
+
+    member.status = "Inactive"
+    db.session.flush()
+
+    # A kiosk lookup on another thread reads (and caches) the committed row
+    def kiosk_lookup():
+        with app.app_context():
+            seen.append(member_index.lookup(member.member_code).status)
+            db.session.remove()
+
+    seen = []
+    reader = threading.Thread(target=kiosk_lookup)
+    reader.start()
+    reader.join()
+    assert seen == ["Active"]
+
+    db.session.commit()
+    assert member_index.lookup(member.member_code).status == "Inactive"
+
+
+def test_rollback_keeps_committed_snapshot(app, plan):
+    member = make_member(plan, status="Active")
+    assert member_index.lookup(member.member_code).status == "Active"
+
+    member.status = "Inactive"
+    db.session.flush()
+    db.session.rollback()
+
+    assert "member_index_pending" not in db.session.info
+    assert member_index.lookup(member.member_code).status == "Active"
+
+
+def test_phone_lookup_is_the_same_cached_or_not(app, plan):
+    member = make_member(plan, phone="+91 98765-43210")
+    for typed in ("9876543210", "98765 43210", "+919876543210", "09876543210"):
+        member_index.clear()
+        member_index._loaded = True  # force the database fallback
+        assert member_index.lookup(typed).id == member.id, typed
+        member_index.clear()
+        assert member_index.lookup(typed).id == member.id, typed
+    member_index.clear()
+    member_index._loaded = True
+    assert member_index.lookup("43210") is None
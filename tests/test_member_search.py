@@ -0,0 +1,34 @@
+from src.utils import member_search
+
+from conftest import make_member
+
+
+def test_name_prefix_search(plan):
+    asha = make_member(plan, name="Asha Kulkarni", phone="9000000001")
+    make_member(plan, name="Ravi Kumar", phone="9000000002")
+    assert member_search.search("kulk") == [asha.id]
+
+
+def test_partial_phone_digits_match_anywhere(plan):
+    tail = make_member(plan, name="Tail Match", phone="9876543210")
+    spaced = make_member(plan, name="Spaced Match", phone="+91 98765-43210")
+    make_member(plan, name="No Match", phone="9123456789")
+    assert sorted(member_search.search("43210")) == sorted([tail.id, spaced.id])
+    assert member_search.search("543210") != []
+
+
+def test_phone_prefix_hits_rank_before_substring_hits(plan):
+    substring = make_member(plan, name="Substring", phone="9000054321")
+    prefix = make_member(plan, name="Prefix", phone="5432100000")
+    assert member_search.search("54321") == [prefix.id, substring.id]
+
+
+def test_partial_phone_pages_do_not_repeat(plan):
+    members = [make_member(plan, name=f"Member {n}", phone=f"90000{n:05d}") for n in range(25)]
+    seen, cursor = [], None
+    while True:
+        ids, cursor = member_search.search_page("0000", limit=10, after=cursor)
+        seen += ids
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(m.id for m in members)
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.models import Member
+from src.utils.pagination import decode_cursor, encode_cursor, keyset_page
+
+from conftest import make_member
+
+SORTS = {
+    "newest": (Member.id, True),
+    "name": (Member.name, False),
+    "expiry": (Member.expiry_date, False),
+    "joined": (Member.join_date, True),
+}
+
+
+@pytest.fixture
+def members(plan):
+    base = date(2025, 1, 1)
+    made = []
+    for n in range(23):
+        # Few distinct names/dates so ties on the sort column are common; some expiries are NULL
+        made.append(make_member(
+            plan, name=f"Member {n % 4}", join_date=base + timedelta(days=n % 3),
+            expiry_date=None if n % 5 == 0 else base + timedelta(days=30 + n % 6),
+        ))
+    return made
+
+
+def _expected(members, column, desc):
+    def key(m):
+        value = getattr(m, column.key)
+        if column is Member.id:
+            return (m.id,)
+        # NULLs last in either direction, then (value, id) in the sort direction
+        return (value is None, value if value is not None else 0, m.id)
+    ordered = sorted(members, key=key)
+    if desc:
+        nulls = [m for m in ordered if column is not Member.id and getattr(m, column.key) is None]
+        ordered = [m for m in reversed(ordered) if m not in nulls] + sorted(nulls, key=lambda m: -m.id)
+    return [m.id for m in ordered]
+
+
+def _walk(column, desc, per_page=5):
+    pages, cursor = [], None
+    while True:
+        page = keyset_page(Member.query, column, Member.id, desc=desc, after=cursor, per_page=per_page)
+        pages.append(page)
+        cursor = page.next_cursor
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("sort", list(SORTS))
+def test_forward_pages_cover_every_row_once_in_order(members, sort):
+    column, desc = SORTS[sort]
+    pages = _walk(column, desc)
+    ids = [m.id for page in pages for m in page.items]
+    assert ids == _expected(members, column, desc)
+    assert pages[0].prev_cursor is None
+
+
+@pytest.mark.parametrize("sort", list(SORTS))
+def test_previous_cursor_returns_the_previous_page(members, sort):
+    column, desc = SORTS[sort]
+    pages = _walk(column, desc)
+    for earlier, later in zip(pages, pages[1:]):
+        back = keyset_page(Member.query, column, Member.id, desc=desc, before=later.prev_cursor, per_page=5)
+        assert [m.id for m in back.items] == [m.id for m in earlier.items]
+
+
+def test_cursor_round_trip_and_garbage():
+    cursor = encode_cursor(date(2025, 2, 3), 42)
+    assert decode_cursor(cursor, Member.expiry_date) == (date(2025, 2, 3), 42)
+    assert decode_cursor("not-a-cursor") is None
+
+
+def test_member_list_follows_cursors(client, plan):
+    for n in range(15):
+        make_member(plan, name=f"Listed {n}", expiry_date=date(2025, 3, 1) + timedelta(days=n % 4))
+    first = keyset_page(Member.query, Member.expiry_date, Member.id, per_page=10)
+    response = client.get(f"/members/?sort=expiry&after={first.next_cursor}")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Listed" in html
+    second = keyset_page(Member.query, Member.expiry_date, Member.id, after=first.next_cursor, per_page=10)
+    assert all(f"/members/{m.id}'" in html for m in second.items)
+    assert all(f"/members/{m.id}'" not in html for m in first.items)
+    assert client.get("/members/?sort=expiry&after=garbage").status_code == 200
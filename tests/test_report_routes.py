@@ -0,0 +1,49 @@
+import time
+from datetime import date, datetime
+
+from src.models import db, ReportJob, Transaction
+from src.routes import report_routes
+
+from conftest import make_member
+
+
+def _wait(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = db.session.get(ReportJob, job_id)
+        if job.status in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("report job did not finish")
+
+
+def test_short_custom_range_is_built_in_the_request(client, plan):
+    member = make_member(plan, join_date=date(2025, 1, 1))
+    db.session.add(Transaction(member_id=member.id, plan_id=plan.id, amount=700, date=datetime(2025, 2, 3)))
+    db.session.commit()
+    custom = report_routes._custom_range({"start": "2025-01-15", "end": "2025-03-31"}, date(2026, 1, 1))
+    assert custom["metrics"]["revenue"]["total"] == 700
+    assert "job" not in custom
+    assert ReportJob.query.count() == 0
+    assert client.get("/reports/?start=2025-01-15&end=2025-03-31").status_code == 200
+
+
+def test_long_custom_range_runs_as_a_report_job(client, plan):
+    member = make_member(plan, join_date=date(2020, 1, 1))
+    db.session.add(Transaction(member_id=member.id, plan_id=plan.id, amount=900, date=datetime(2021, 6, 1)))
+    db.session.commit()
+    args = {"start": "2020-01-01", "end": "2024-12-31", "compare": "1"}
+
+    response = client.get("/reports/?start=2020-01-01&end=2024-12-31&compare=1")
+    assert response.status_code == 200
+    assert b'id="customJob"' in response.data
+
+    custom = report_routes._custom_range(args, date(2026, 1, 1))
+    job = _wait(custom.get("job", {}).get("job_id") or ReportJob.query.one().id)
+    assert job.status == "done", job.error
+
+    custom = report_routes._custom_range(args, date(2026, 1, 1))
+    assert custom["metrics"]["revenue"]["total"] == 900
+    assert len(custom["labels"]) == 60
+    assert ReportJob.query.count() == 1
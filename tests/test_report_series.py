@@ -0,0 +1,55 @@
+from datetime import date, datetime
+
+from src.models import db, Transaction
+from src.utils import rollups
+from src.utils.series_cache import compare
+
+from conftest import make_member
+
+
+def _pay(member, plan, day, amount):
+    db.session.add(Transaction(
+        member_id=member.id, plan_id=plan.id, amount=amount,
+        date=datetime.combine(day, datetime.min.time()), transaction_type="Renewal",
+    ))
+
+
+def _seed(plan):
+    member = make_member(plan, join_date=date(2024, 11, 1))
+    for day, amount in [
+        (date(2024, 11, 15), 300),
+        (date(2025, 1, 10), 500),
+        (date(2025, 1, 20), 1000),
+        (date(2025, 2, 5), 2000),
+        (date(2025, 3, 10), 100),
+    ]:
+        _pay(member, plan, day, amount)
+    db.session.commit()
+
+
+def test_month_series_clips_partial_first_month(plan):
+    _seed(plan)
+    series = rollups.revenue_series(date(2025, 1, 15), date(2025, 3, 31), "month")
+    assert series == [(date(2025, 1, 1), 1000), (date(2025, 2, 1), 2000), (date(2025, 3, 1), 100)]
+
+
+def test_month_series_clips_partial_last_month(plan):
+    _seed(plan)
+    series = rollups.revenue_series(date(2025, 1, 1), date(2025, 1, 12), "month")
+    assert series == [(date(2025, 1, 1), 500)]
+    series = rollups.revenue_series(date(2024, 11, 1), date(2025, 1, 12), "month")
+    assert [v for _, v in series] == [300, 0, 500]
+
+
+def test_compare_splits_at_exact_start(plan):
+    _seed(plan)
+    current, previous = compare("revenue", date(2025, 1, 15), date(2025, 3, 31), "month")
+    assert sum(v for _, v in current) == 3100
+    assert [v for _, v in previous] == [300, 0, 500]
+
+
+def test_compare_whole_months(plan):
+    _seed(plan)
+    current, previous = compare("revenue", date(2025, 1, 1), date(2025, 3, 31), "month")
+    assert [v for _, v in current] == [1500, 2000, 100]
+    assert [v for _, v in previous] == [0, 300, 0]
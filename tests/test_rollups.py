@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+from sqlalchemy import insert
+
+from src.models import db, Expense, ExpenseRollup, RevenueRollup, Transaction
+from src.utils import rollups
+
+from conftest import make_member
+
+
+def _rows(model):
+    return sorted(
+        tuple(getattr(row, c.name) for c in model.__table__.columns)
+        for row in model.query.filter(model.tx_count != 0)
+    )
+
+
+def _seed(plan):
+    member = make_member(plan, join_date=date(2025, 1, 1))
+    for when, amount, tx_type, method in [
+        (datetime(2025, 1, 3, 9), 1000, "New Membership", "Cash"),
+        (datetime(2025, 1, 3, 18), 500, "Renewal", "UPI"),
+        (datetime(2025, 1, 31, 23, 30), 250, "Renewal", "Cash"),
+        (datetime(2025, 2, 1, 0, 15), 700, "Renewal", "Cash"),
+    ]:
+        db.session.add(Transaction(member_id=member.id, plan_id=plan.id, amount=amount,
+                                   date=when, transaction_type=tx_type, payment_method=method))
+    db.session.add(Expense(description="Rent", amount=3000, category="Rent", date=date(2025, 1, 5)))
+    db.session.add(Expense(description="Water", amount=200, category="Utilities", date=date(2025, 2, 2)))
+    db.session.commit()
+    return member
+
+
+def test_model_events_keep_rollups_equal_to_a_backfill(plan):
+    _seed(plan)
+    live = _rows(RevenueRollup), _rows(ExpenseRollup)
+    rollups.backfill()
+    assert (_rows(RevenueRollup), _rows(ExpenseRollup)) == live
+
+
+def test_totals_read_day_and_month_rows(plan):
+    _seed(plan)
+    assert rollups.revenue_total(date(2025, 1, 1), date(2025, 1, 31)) == 1750
+    assert rollups.revenue_total(date(2025, 1, 3), date(2025, 1, 3)) == 1500
+    assert rollups.revenue_total(date(2025, 1, 1), date(2025, 2, 28), "Renewal") == 1450
+    assert rollups.revenue_total(date(2025, 1, 1), date(2025, 1, 31), "Renewal", measure="tx_count") == 2
+    assert rollups.expense_total(date(2025, 1, 1)) == 3000
+    assert rollups.revenue_series(date(2025, 1, 1), date(2025, 2, 28), "month") == [
+        (date(2025, 1, 1), 1750), (date(2025, 2, 1), 700)]
+
+
+def test_deleting_a_transaction_subtracts_it(plan):
+    member = _seed(plan)
+    tx = Transaction.query.filter_by(member_id=member.id, amount=250).one()
+    db.session.delete(tx)
+    db.session.commit()
+    assert rollups.revenue_total(date(2025, 1, 1), date(2025, 1, 31)) == 1500
+    assert rollups.revenue_total(date(2025, 1, 31), date(2025, 1, 31)) == 0
+
+
+def test_record_transactions_covers_core_inserts(plan):
+    member = make_member(plan)
+    rows = [{"member_id": member.id, "plan_id": plan.id, "amount": 400, "date": datetime(2025, 3, 9),
+             "payment_method": "Cash", "transaction_type": "Renewal"} for _ in range(3)]
+    db.session.execute(insert(Transaction), rows)
+    rollups.record_transactions(db.session.connection(), rows)
+    db.session.commit()
+    live = _rows(RevenueRollup)
+    assert rollups.revenue_total(date(2025, 3, 1), date(2025, 3, 31), measure="tx_count") == 3
+    rollups.backfill()
+    assert _rows(RevenueRollup) == live
@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from src.utils.typeahead import MemberTypeahead, Suggestion
+
+
+def _index(suggestions):
+    index = MemberTypeahead()
+    index._loaded = True
+    for s in suggestions:
+        index.put(s)
+    return index
+
+
+def _member(member_id, name, phone=None, status="Active", expires_in=30):
+    return Suggestion(member_id, f"{10000 + member_id}", name, phone, status,
+                      date.today() + timedelta(days=expires_in), None)
+
+
+def test_ranking_covers_the_whole_prefix_run():
+    # 500 lapsed members whose keys sort before the one current member sharing the prefix
+    lapsed = [_member(n, f"Aaron {n:03d}", expires_in=-60) for n in range(1, 501)]
+    current = _member(900, "Azra Khan")
+    index = _index(lapsed + [current])
+    assert index.suggest("a", limit=5)[0].id == 900
+
+
+def test_shorter_name_late_in_the_run_still_ranks_first():
+    longer = [_member(n, f"Aaron Fitzgerald {n:03d}") for n in range(1, 501)]
+    short = _member(900, "Azi")
+    index = _index(longer + [short])
+    assert [s.id for s in index.suggest("a", limit=3)][0] == 900